@@ -0,0 +1,78 @@
+# api/errors.py
+#
+# Error classes for API calls, so callers can tell a blip worth retrying
+# from a payload the server rejected or a dead credential.
+#
+#   ApiError
+#     TransientError      network error, timeout, 429, 5xx
+#       CircuitOpenError  endpoint marked unhealthy, not even tried
+#     AuthError           401 / 403
+#     ClientError         any other 4xx
+#       ValidationError   400 with the backend's validation body
+#         PreflightError  payload rejected locally, before it was sent
+#
+#   DeadlineExceeded      the application ran out of its time budget
+
+import requests
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=None, path=None, code=None, log_id=None, details=None):
+        super().__init__(message)
+        self.status = status
+        self.path = path
+        self.code = code
+        self.log_id = log_id
+        self.details = details
+
+
+class TransientError(ApiError):
+    pass
+
+
+class CircuitOpenError(TransientError):
+    pass
+
+
+class AuthError(ApiError):
+    pass
+
+
+class ClientError(ApiError):
+    pass
+
+
+class ValidationError(ClientError):
+    pass
+
+
+class PreflightError(ValidationError):
+    pass
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+TRANSIENT_STATUS = (429, 500, 502, 503, 504)
+
+# what requests raises for a call that never got a response
+NETWORK_ERRORS = (requests.ConnectionError, requests.Timeout)
+
+
+def is_transient(status):
+    return status in TRANSIENT_STATUS or (status is not None and status >= 500)
+
+
+def raise_for_response(res, path=None):
+    status = res.status_code
+    if status < 400:
+        return
+    path = path or res.url
+    text = res.text[:500]
+
+    if status in (401, 403):
+        raise AuthError(f"AUTH {status} on {path}: {text}", status, path)
+    if is_transient(status):
+        raise TransientError(f"TRANSIENT {status} on {path}: {text}", status, path)
+    raise ClientError(f"CLIENT ERROR {status} on {path}: {text}", status, path)
@@ -1,27 +1,109 @@
-import requests
 import json
-from config import BASE, HEADERS
+from config import BASE, HTTP_DEBUG
+from api.errors import ValidationError, raise_for_response
+from api.transport import request
+from utils.app_state import current_app
+
+_DEBUG = HTTP_DEBUG
+
+
+def set_http_debug(enabled):
+    global _DEBUG
+    _DEBUG = bool(enabled)
+
+
+def http_debug():
+    return _DEBUG
+
+
+# -------------------------------------------------------
+# PER-APPLICATION READ-THROUGH CACHE
+# -------------------------------------------------------
+# GETs that must always reach the server (general_info creates the application)
+_UNCACHEABLE = ("/step/general_info",)
+
+
+def _cache_key(path, params):
+    items = tuple(sorted((str(k), str(v)) for k, v in (params or {}).items()))
+    return path.rstrip("?"), items
+
+
+def _write_scope(path):
+    # cached GET paths a write to `path` can make stale
+    path = path.rstrip("?")
+    parts = path.strip("/").split("/")
+
+    if len(parts) >= 4 and parts[0] == "invt":
+        invt_root = f"/invt/{parts[1]}"
+        kind, code = parts[2], parts[3]
+        if kind == "popup_subform":
+            # popups feed their parent subforms (e.g. share_holder)
+            return (invt_root,)
+        if kind == "form":
+            return (f"{invt_root}/form/{code}", f"/step/{code}")
+        return (f"{invt_root}/{kind}/{code}",)
+
+    return (path,)
+
+
+def invalidate_reads(path):
+    state = current_app()
+    if state is None or not state.get_cache:
+        return
+    prefixes = _write_scope(path)
+    with state.cache_lock:
+        stale = [k for k in state.get_cache if k[0].startswith(prefixes)]
+        for k in stale:
+            del state.get_cache[k]
+
+
+def read_cache_stats():
+    state = current_app()
+    if state is None:
+        return None
+    return {"hits": state.get_cache_hits, "misses": state.get_cache_misses}
+
 
 def http_get(path, params=None):
-    res = requests.get(BASE + path, headers=HEADERS, params=params)
-    res.raise_for_status()
-    return res.json()
+    state = current_app()
+    if state is None or path.startswith(_UNCACHEABLE):
+        res = request("GET", BASE + path, params=params)
+        raise_for_response(res, path)
+        return res.json()
+
+    key = _cache_key(path, params)
+    with state.cache_lock:
+        if key in state.get_cache:
+            state.get_cache_hits += 1
+            return state.get_cache[key]
+        state.get_cache_misses += 1
+
+    res = request("GET", BASE + path, params=params)
+    raise_for_response(res, path)
+    body = res.json()
+
+    with state.cache_lock:
+        state.get_cache[key] = body
+    return body
 
 def http_put(path, data=None):
     url = BASE + path
-    print("\n==================== PUT DEBUG ====================")
-    print("URL:", url)
-    print("BODY:", json.dumps(data, ensure_ascii=False, indent=2))
-    res = requests.put(url, headers=HEADERS, json=data)
-    print("STATUS:", res.status_code)
-    print("RESPONSE:", res.text)
-    print("===================================================\n")
+    if _DEBUG:
+        print("\n==================== PUT DEBUG ====================")
+        print("URL:", url)
+        print("BODY:", json.dumps(data, ensure_ascii=False, indent=2))
+    res = request("PUT", url, json=data)
+    invalidate_reads(path)
+    if _DEBUG:
+        print("STATUS:", res.status_code)
+        print("RESPONSE:", res.text)
+        print("===================================================\n")
 
     if res.status_code == 400:
         try:
             body = res.json()
-        except:
-            raise Exception(f"PUT ERROR 400 (non-JSON): {res.text}")
+        except ValueError:
+            raise ValidationError(f"PUT ERROR 400 (non-JSON): {res.text}", 400, path)
 
         log_id = body.get("log_id")
         code = body.get("code")
@@ -32,27 +114,39 @@ def http_put(path, data=None):
             print("VALIDATION DETAILS:")
             print(json.dumps(details, indent=2, ensure_ascii=False))
 
-        raise Exception(f"VALIDATION 400 (code={code}, log_id={log_id}): {msg}")
+        state = current_app()
+        if state is not None:
+            state.error_info = {"status": 400, "code": code, "log_id": log_id, "path": path}
+
+        raise ValidationError(
+            f"VALIDATION 400 (code={code}, log_id={log_id}): {msg}",
+            400, path, code, log_id, details,
+        )
+
+    raise_for_response(res, path)
 
 def http_post(path, body):
     url = BASE + path
 
-    print("\n==================== POST DEBUG ====================")
-    print("URL:", url)
-    print("BODY:", json.dumps(body, indent=2, ensure_ascii=False))
+    if _DEBUG:
+        print("\n==================== POST DEBUG ====================")
+        print("URL:", url)
+        print("BODY:", json.dumps(body, indent=2, ensure_ascii=False))
 
-    res = requests.post(
+    res = request(
+        "POST",
         url,
-        headers={**HEADERS, "Content-Type": "application/json"},
+        headers={"Content-Type": "application/json"},
         json=body
     )
+    invalidate_reads(path)
 
-    print("STATUS:", res.status_code)
-    print("RESPONSE:", res.text)
-    print("===================================================\n")
+    if _DEBUG:
+        print("STATUS:", res.status_code)
+        print("RESPONSE:", res.text)
+        print("===================================================\n")
 
-    if res.status_code >= 400:
-        raise Exception(f"POST ERROR {res.status_code}: {res.text}")
+    raise_for_response(res, path)
 
     try:
         return res.json()
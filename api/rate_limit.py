@@ -0,0 +1,183 @@
+# api/rate_limit.py
+#
+# Token buckets per endpoint class plus a global one, in front of every
+# request. Rates adapt AIMD-style: each healthy response adds a little
+# (about +increase req/s per second of traffic), a 429 / 5xx / connection
+# error / latency over the class target halves the rate (at most once per
+# cooldown).
+# A Retry-After on 429/503 pauses the bucket for that long.
+
+import json
+import threading
+import time
+
+from config import RATE_LIMIT, RATE_LIMITS, RATE_LATENCY_TARGETS
+
+# class -> (start rate, min rate, max rate, burst)
+DEFAULT_LIMITS = {
+    "read": (50.0, 2.0, 400.0, 20),
+    "save": (20.0, 1.0, 200.0, 10),
+    "upload": (10.0, 0.5, 100.0, 5),
+    "sign": (5.0, 0.5, 50.0, 3),
+    "global": (100.0, 5.0, 1000.0, 40),
+}
+
+# class -> latency (seconds) above which a response counts as backpressure;
+# uploads and sign are slow even on a healthy server
+LATENCY_TARGETS = {"read": 2.0, "save": 4.0, "upload": 30.0, "sign": 15.0}
+LATENCY_TARGETS.update({k: float(v) for k, v in json.loads(RATE_LATENCY_TARGETS or "{}").items()})
+
+_ENABLED = RATE_LIMIT
+_BUCKETS = None
+_INIT_LOCK = threading.Lock()
+
+
+class _Bucket:
+    def __init__(self, name, rate, min_rate, max_rate, burst, increase=1.0, cooldown=1.0):
+        self.name = name
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase = increase
+        self.cooldown = cooldown
+
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.lock = threading.Lock()
+
+        self.requests = 0
+        self.waits = 0
+        self.waited = 0.0
+        self.throttled = 0
+        self.decreases = 0
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self):
+        # take one token; returns how long the caller has to sleep first
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            self.requests += 1
+            delay = max(0.0, -self.tokens / self.rate, self.paused_until - now)
+            if delay:
+                self.waits += 1
+                self.waited += delay
+            return delay
+
+    def success(self):
+        with self.lock:
+            # additive increase, spread over the requests of one second
+            self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+    def backoff(self, retry_after=None):
+        with self.lock:
+            now = time.monotonic()
+            self.throttled += 1
+            if retry_after:
+                self.paused_until = max(self.paused_until, now + retry_after)
+            if now - self.last_decrease < self.cooldown:
+                return
+            self.last_decrease = now
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+            self.decreases += 1
+            print(f"rate limit [{self.name}] -> {self.rate:.1f} req/s")
+
+    def stats(self):
+        with self.lock:
+            return {
+                "rate": round(self.rate, 2),
+                "min": self.min_rate,
+                "max": self.max_rate,
+                "requests": self.requests,
+                "waits": self.waits,
+                "waited": round(self.waited, 3),
+                "throttled": self.throttled,
+                "decreases": self.decreases,
+            }
+
+
+def _buckets():
+    global _BUCKETS
+    if _BUCKETS is None:
+        with _INIT_LOCK:
+            if _BUCKETS is None:
+                start = json.loads(RATE_LIMITS) if RATE_LIMITS else {}
+                buckets = {}
+                for name, (rate, lo, hi, burst) in DEFAULT_LIMITS.items():
+                    rate = float(start.get(name, rate))
+                    buckets[name] = _Bucket(name, rate, min(lo, rate), max(hi, rate), burst)
+                _BUCKETS = buckets
+    return _BUCKETS
+
+
+def set_rate_limit(enabled):
+    global _ENABLED
+    _ENABLED = bool(enabled)
+
+
+def reset():
+    global _BUCKETS
+    with _INIT_LOCK:
+        _BUCKETS = None
+
+
+def endpoint_class(method, endpoint):
+    if "/temp/upload" in endpoint:
+        return "upload"
+    if endpoint.endswith("/application/sign"):
+        return "sign"
+    if method == "GET":
+        return "read"
+    return "save"
+
+
+def acquire(method, endpoint):
+    # block until both the class bucket and the global bucket allow a request
+    if not _ENABLED:
+        return None
+    buckets = _buckets()
+    key = endpoint_class(method, endpoint)
+    delay = max(buckets[key].reserve(), buckets["global"].reserve())
+    if delay:
+        time.sleep(delay)
+    return key
+
+
+def retry_after(res):
+    value = res.headers.get("Retry-After") if res is not None else None
+    try:
+        return min(60.0, float(value)) if value else None
+    except ValueError:
+        return None
+
+
+def observe(key, res, elapsed):
+    # feed one outcome back; res is None when the request itself failed
+    if key is None:
+        return
+    buckets = _buckets()
+    status = res.status_code if res is not None else None
+
+    if status is None or status == 429 or status >= 500:
+        pause = retry_after(res)
+        buckets[key].backoff(pause)
+        buckets["global"].backoff(pause)
+    elif elapsed > LATENCY_TARGETS[key]:
+        buckets[key].backoff()
+    else:
+        buckets[key].success()
+        buckets["global"].success()
+
+
+def rate_limit_stats():
+    if _BUCKETS is None:
+        return {}
+    return {name: b.stats() for name, b in _BUCKETS.items()}
@@ -0,0 +1,119 @@
+# api/resilience.py
+#
+# Retry policy and per-endpoint circuit breakers used by transport.request.
+# Only safe / idempotent calls are retried (GETs and .../data/save PUTs),
+# and only on transient failures, with exponential backoff and full jitter.
+# An endpoint that keeps failing is short-circuited for a cooldown, then a
+# single probe decides whether it closes again.
+
+import random
+import threading
+import time
+
+from api.errors import CircuitOpenError
+from api.rate_limit import retry_after
+from config import RETRY_ATTEMPTS, RETRY_BASE, RETRY_MAX, BREAKER_THRESHOLD, BREAKER_COOLDOWN
+
+_CIRCUITS = {}
+_LOCK = threading.Lock()
+
+# GETs with side effects (general_info creates the application)
+_NOT_IDEMPOTENT = ("/step/general_info",)
+
+
+def retryable(method, endpoint):
+    if method == "GET":
+        return not endpoint.startswith(_NOT_IDEMPOTENT)
+    return method == "PUT" and endpoint.endswith("/data/save")
+
+
+def attempts_for(method, endpoint):
+    return 1 + RETRY_ATTEMPTS if retryable(method, endpoint) else 1
+
+
+def backoff_delay(attempt, res=None):
+    delay = random.uniform(0, min(RETRY_MAX, RETRY_BASE * (2 ** attempt)))
+    pause = retry_after(res) if res is not None else None
+    return max(delay, pause or 0.0)
+
+
+# -------------------------------------------------------
+# CIRCUIT BREAKER
+# -------------------------------------------------------
+class _Circuit:
+    def __init__(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.trips = 0
+        self.rejected = 0
+
+
+def _circuit(endpoint):
+    circuit = _CIRCUITS.get(endpoint)
+    if circuit is None:
+        circuit = _CIRCUITS.setdefault(endpoint, _Circuit())
+    return circuit
+
+
+def check_circuit(endpoint):
+    # True when this call is the half-open probe (see release_probe)
+    if BREAKER_THRESHOLD <= 0:
+        return False
+    with _LOCK:
+        c = _circuit(endpoint)
+        if c.opened_at is None:
+            return False
+        if time.monotonic() - c.opened_at >= BREAKER_COOLDOWN and not c.probing:
+            # half-open: let one request through to test the endpoint
+            c.probing = True
+            return True
+        c.rejected += 1
+    raise CircuitOpenError(f"CIRCUIT OPEN for {endpoint}", None, endpoint)
+
+
+def release_probe(endpoint):
+    # the probe never reached the wire (deadline, no token...): let the
+    # next call probe instead of leaving the circuit open for good
+    with _LOCK:
+        _circuit(endpoint).probing = False
+
+
+def record_outcome(endpoint, ok):
+    if BREAKER_THRESHOLD <= 0:
+        return
+    with _LOCK:
+        c = _circuit(endpoint)
+        if ok:
+            if c.opened_at is not None:
+                print("circuit closed:", endpoint)
+            c.failures = 0
+            c.opened_at = None
+            c.probing = False
+            return
+
+        c.failures += 1
+        if c.probing or (c.opened_at is None and c.failures >= BREAKER_THRESHOLD):
+            c.opened_at = time.monotonic()
+            c.probing = False
+            c.trips += 1
+            print(f"circuit open ({c.failures} failures):", endpoint)
+
+
+def circuit_stats():
+    with _LOCK:
+        return {
+            endpoint: {
+                "open": c.opened_at is not None,
+                "failures": c.failures,
+                "trips": c.trips,
+                "rejected": c.rejected,
+            }
+            for endpoint, c in _CIRCUITS.items()
+            if c.trips or c.failures
+        }
+
+
+def reset_circuits():
+    with _LOCK:
+        _CIRCUITS.clear()
@@ -0,0 +1,133 @@
+# api/token_pool.py
+#
+# Credential pool. Tokens come from TOKENS / TOKEN_FILE (or the single
+# TOKEN), each application gets one for its whole run (round-robin or
+# least-loaded), and a token that answers 401 or whose JWT has expired is
+# taken out of rotation.
+
+import base64
+import json
+import os
+import threading
+import time
+
+from config import TOKEN, TOKENS, TOKEN_FILE, TOKEN_ASSIGNMENT, TOKEN_EXPIRY_MARGIN
+
+_LOCK = threading.Lock()
+_POOL = None  # list of dicts: token, active, in_use, assigned, reason, exp
+_NEXT = 0
+
+
+def _jwt_exp(token):
+    # exp claim of a JWT, None for anything else
+    parts = token.split(".")
+    if len(parts) != 3:
+        return None
+    try:
+        payload = parts[1] + "=" * (-len(parts[1]) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+        return float(exp) if exp is not None else None
+    except Exception:
+        return None
+
+
+def _read_tokens():
+    tokens = [t.strip() for t in TOKENS.split(",") if t.strip()]
+    if TOKEN_FILE and os.path.exists(TOKEN_FILE):
+        with open(TOKEN_FILE, encoding="utf-8") as f:
+            tokens += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    if not tokens and TOKEN:
+        tokens = [TOKEN]
+
+    seen = set()
+    return [t for t in tokens if not (t in seen or seen.add(t))]
+
+
+def _pool():
+    global _POOL, _NEXT
+    if _POOL is None:
+        with _LOCK:
+            if _POOL is None:
+                _POOL = [
+                    {"token": t, "active": True, "in_use": 0, "assigned": 0,
+                     "reason": None, "exp": _jwt_exp(t)}
+                    for t in _read_tokens()
+                ]
+                # fleet workers start at different accounts (see reset_pool)
+                _NEXT = os.getpid() % max(1, len(_POOL))
+    return _POOL
+
+
+def reset_pool():
+    # forked fleet workers: drop the pool (and its round-robin position)
+    # inherited from the parent, so each child rebuilds it under its own pid
+    global _POOL, _NEXT, _LOCK
+    _LOCK = threading.Lock()
+    _POOL = None
+    _NEXT = 0
+
+
+def _usable(entry, now):
+    if not entry["active"]:
+        return False
+    if entry["exp"] is not None and entry["exp"] - TOKEN_EXPIRY_MARGIN <= now:
+        entry["active"] = False
+        entry["reason"] = "expired"
+        print("token out of rotation: expired", mask(entry["token"]))
+        return False
+    return True
+
+
+def acquire():
+    global _NEXT
+    pool = _pool()
+    now = time.time()
+    with _LOCK:
+        live = [e for e in pool if _usable(e, now)]
+        if not live:
+            raise Exception("No usable API token left in the pool")
+
+        if TOKEN_ASSIGNMENT == "round_robin":
+            entry = live[_NEXT % len(live)]
+            _NEXT += 1
+        else:
+            entry = min(live, key=lambda e: (e["in_use"], e["assigned"]))
+
+        entry["in_use"] += 1
+        entry["assigned"] += 1
+        return entry["token"]
+
+
+def release(token):
+    if token is None:
+        return
+    pool = _pool()
+    with _LOCK:
+        for e in pool:
+            if e["token"] == token:
+                e["in_use"] = max(0, e["in_use"] - 1)
+                return
+
+
+def retire(token, reason="401"):
+    pool = _pool()
+    with _LOCK:
+        for e in pool:
+            if e["token"] == token and e["active"]:
+                e["active"] = False
+                e["reason"] = reason
+                print(f"token out of rotation: {reason}", mask(token))
+                return
+
+
+def default_token():
+    pool = _pool()
+    for e in pool:
+        if e["active"]:
+            return e["token"]
+    return TOKEN
+
+
+def mask(token):
+    return f"...{token[-6:]}" if token else None
+
@@ -0,0 +1,216 @@
+# api/transport.py
+#
+# One pooled requests.Session shared by every API call, so connections
+# (TCP + TLS) are kept alive and reused instead of opened per request.
+# Every call goes through the adaptive rate limiter (api/rate_limit.py) and
+# the retry / circuit-breaker policy (api/resilience.py).
+
+import json
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from api import rate_limit, resilience, token_pool
+from api.errors import NETWORK_ERRORS, DeadlineExceeded, TransientError, is_transient
+from config import BASE, UPLOAD_BASE, HEADERS, POOL_SIZE, UPLOAD_POOL_SIZE, CONNECT_TIMEOUT, REQUEST_TIMEOUTS
+from utils.app_state import current_app, check_deadline, remaining_time, request_slot
+
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+
+# read timeouts per endpoint class (see api/rate_limit.endpoint_class)
+_READ_TIMEOUTS = {"read": 30.0, "save": 60.0, "upload": 120.0, "sign": 60.0}
+_READ_TIMEOUTS.update({k: float(v) for k, v in json.loads(REQUEST_TIMEOUTS or "{}").items()})
+
+
+def _mount_pool(session, prefix, size):
+    if not prefix:
+        return
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size, pool_block=True)
+    session.mount(prefix, adapter)
+
+
+def _build_session():
+    session = requests.Session()
+    # Authorization is set per request from the token pool, never statically
+    session.headers.update({k: v for k, v in HEADERS.items() if k != "Authorization"})
+
+    # default pool for anything that is not BASE / UPLOAD_BASE
+    session.mount("http://", HTTPAdapter(pool_maxsize=POOL_SIZE))
+    session.mount("https://", HTTPAdapter(pool_maxsize=POOL_SIZE))
+
+    _mount_pool(session, BASE, POOL_SIZE)
+    _mount_pool(session, UPLOAD_BASE, UPLOAD_POOL_SIZE)
+    return session
+
+
+def get_session():
+    global _SESSION
+    if _SESSION is None:
+        with _SESSION_LOCK:
+            if _SESSION is None:
+                _SESSION = _build_session()
+    return _SESSION
+
+
+def reset_session():
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is not None:
+            _SESSION.close()
+        _SESSION = None
+
+
+def _endpoint(url):
+    # /invt/1234/subform/x/object/99/data/save?  ->  /invt/{id}/subform/x/object/{id}/data/save
+    for prefix in (BASE, UPLOAD_BASE):
+        if prefix and url.startswith(prefix):
+            url = url[len(prefix):]
+            break
+    path = url.split("?", 1)[0]
+    parts = []
+    for seg in path.split("/"):
+        if seg.isdigit() or (len(seg) >= 16 and all(c in "0123456789abcdefABCDEF-" for c in seg)):
+            seg = "{id}"
+        parts.append(seg)
+    return "/".join(parts) or "/"
+
+
+def _body_size(res):
+    length = res.request.headers.get("Content-Length")
+    if length and length.isdigit():
+        return int(length)
+    body = res.request.body
+    return len(body) if isinstance(body, (bytes, str)) else 0
+
+
+def app_token(state):
+    # the account this application runs under, picked on first use
+    if state.token is None:
+        with state.lock:
+            if state.token is None:
+                state.token = token_pool.acquire()
+    return state.token
+
+
+def release_app_token(state):
+    if state is not None and state.token is not None:
+        token_pool.release(state.token)
+
+
+def _timeout(method, endpoint):
+    # (connect, read) for this endpoint class, never past the app's deadline
+    read = _READ_TIMEOUTS[rate_limit.endpoint_class(method, endpoint)]
+    left = remaining_time()
+    if left is not None:
+        if left <= 0:
+            check_deadline(endpoint)
+        read = min(read, left)
+    return (min(CONNECT_TIMEOUT, read), read)
+
+
+def _send(method, url, endpoint, **kwargs):
+    # paced by the per-endpoint rate limiter, outcome fed back to it
+    key = rate_limit.acquire(method, endpoint)
+    kwargs.setdefault("timeout", _timeout(method, endpoint))
+    t0 = time.perf_counter()
+    try:
+        res = get_session().request(method, url, **kwargs)
+    except Exception:
+        rate_limit.observe(key, None, time.perf_counter() - t0)
+        raise
+    rate_limit.observe(key, res, time.perf_counter() - t0)
+    return res
+
+
+def _attempt(state, method, url, endpoint, switched=False, **kwargs):
+    # one try on the wire, under the application's token, timed for the ledger
+    token = app_token(state) if state is not None else token_pool.default_token()
+    if token:
+        kwargs["headers"] = {**(kwargs.get("headers") or {}), "Authorization": f"Bearer {token}"}
+    if state is None:
+        return _send(method, url, endpoint, **kwargs)
+
+    started = time.time()
+    t0 = time.perf_counter()
+    try:
+        with request_slot(state):
+            res = _send(method, url, endpoint, **kwargs)
+    except Exception:
+        state.requests.append(
+            (method, endpoint, None, started, time.perf_counter() - t0, 0, 0)
+        )
+        raise
+
+    state.requests.append((
+        method, endpoint, res.status_code, started, time.perf_counter() - t0,
+        _body_size(res), len(res.content),
+    ))
+    if res.status_code == 401:
+        token_pool.retire(token, "401")
+        # nothing created under this account yet: move the app to another one
+        if state.invt_id is None and not switched:
+            with state.lock:
+                if state.token == token:
+                    token_pool.release(token)
+                    state.token = None
+            return _attempt(state, method, url, endpoint, True, **kwargs)
+    return res
+
+
+def _retry_delay(attempt, endpoint, res=None):
+    # a retry that cannot start before the deadline is not worth waiting for
+    delay = resilience.backoff_delay(attempt, res)
+    left = remaining_time()
+    if left is not None and delay >= left:
+        raise DeadlineExceeded(f"deadline exceeded before retrying {endpoint}")
+    return delay
+
+
+def request(method, url, **kwargs):
+    # transient failures of GETs / data saves are retried with jittered
+    # backoff; the endpoint's circuit breaker fails fast while it is down
+    endpoint = _endpoint(url)
+    state = current_app()
+    attempts = resilience.attempts_for(method, endpoint)
+
+    for attempt in range(attempts):
+        probe = resilience.check_circuit(endpoint)
+        try:
+            res = _attempt(state, method, url, endpoint, **kwargs)
+        except NETWORK_ERRORS as e:
+            resilience.record_outcome(endpoint, False)
+            left = remaining_time()
+            if left is not None and left <= 0:
+                raise DeadlineExceeded(f"deadline exceeded waiting for {endpoint}") from e
+            if attempt + 1 >= attempts:
+                raise TransientError(f"NETWORK ERROR on {endpoint}: {e}", None, endpoint) from e
+            delay = _retry_delay(attempt, endpoint)
+            print(f"retry {attempt + 1}/{attempts - 1} in {delay:.2f}s ({type(e).__name__}):", endpoint)
+            time.sleep(delay)
+            continue
+        except requests.RequestException:
+            # other wire-level failures (bad response, too many redirects...);
+            # local errors such as DeadlineExceeded never trip the breaker
+            resilience.record_outcome(endpoint, False)
+            raise
+        except Exception:
+            if probe:
+                resilience.release_probe(endpoint)
+            raise
+
+        transient = is_transient(res.status_code)
+        resilience.record_outcome(endpoint, not transient)
+        if not transient or attempt + 1 >= attempts:
+            return res
+
+        delay = _retry_delay(attempt, endpoint, res)
+        print(f"retry {attempt + 1}/{attempts - 1} in {delay:.2f}s (HTTP {res.status_code}):", endpoint)
+        time.sleep(delay)
+
+
+def current_token():
+    state = current_app()
+    return app_token(state) if state is not None else token_pool.default_token()
@@ -1,44 +1,85 @@
-import requests
-from config import UPLOAD_BASE, TOKEN, HEADERS, BASE
+import threading
+import time
+
+from config import UPLOAD_BASE, BASE, UPLOAD_DEDUP, UPLOAD_DEDUP_TTL
+from api.errors import raise_for_response
+from api.transport import request, current_token
+from utils.assets import upload_variant
+
+# token -> /users/me id (keyed by token, so a token switch looks it up again)
+_USER_IDS = {}
+# (endpoint, token, sha256) -> (file_id, uploaded_at)
+_FILE_IDS = {}
+_LOCK = threading.Lock()
+_DEDUP = UPLOAD_DEDUP
+
+
+def set_upload_dedup(enabled):
+    global _DEDUP
+    _DEDUP = bool(enabled)
+    if not _DEDUP:
+        with _LOCK:
+            _FILE_IDS.clear()
 
 
 def get_user_id():
-    res = requests.get(f"{BASE}/users/me", headers=HEADERS)
-    res.raise_for_status()
-    return res.json()["data"]["id"]
+    token = current_token()
+    with _LOCK:
+        if token in _USER_IDS:
+            return _USER_IDS[token]
 
+    res = request("GET", f"{BASE}/users/me")
+    raise_for_response(res)
+    user_id = res.json()["data"]["id"]
 
-def upload_temp_attachment(path_to_file):
-    user_id = get_user_id()
+    with _LOCK:
+        _USER_IDS[token] = user_id
+    return user_id
 
-    with open(path_to_file, "rb") as f:
-        files = {"file": f}
-        data = {"user_id": user_id}
 
-        res = requests.post(
-            f"{UPLOAD_BASE}/temp/upload/attachment",
-            headers={"Authorization": f"Bearer {TOKEN}"},
-            data=data,
-            files=files,
-        )
+def _reused_file_id(key):
+    with _LOCK:
+        hit = _FILE_IDS.get(key)
+        if hit is None:
+            return None
+        if time.time() - hit[1] >= UPLOAD_DEDUP_TTL:
+            del _FILE_IDS[key]
+            return None
+        return hit[0]
 
-    res.raise_for_status()
-    return res.json()["data"]["file_id"]
 
+def _upload(endpoint, path, extra=None):
+    asset = upload_variant(path)
+    key = (endpoint, current_token(), asset.digest)
+
+    if _DEDUP:
+        file_id = _reused_file_id(key)
+        if file_id is not None:
+            return file_id
 
-def upload_temp_image(path_to_image):
     user_id = get_user_id()
+    files = {"file": (asset.name, asset.data, asset.mime)}
+    data = {"user_id": user_id, **(extra or {})}
+
+    res = request(
+        "POST",
+        f"{UPLOAD_BASE}/temp/upload/{endpoint}",
+        data=data,
+        files=files,
+    )
 
-    with open(path_to_image, "rb") as f:
-        files = {"file": f}
-        data = {"user_id": user_id, "is_photo_id": "1"}
+    raise_for_response(res)
+    file_id = res.json()["data"]["file_id"]
 
-        res = requests.post(
-            f"{UPLOAD_BASE}/temp/upload/image",
-            headers={"Authorization": f"Bearer {TOKEN}"},
-            data=data,
-            files=files,
-        )
+    if _DEDUP:
+        with _LOCK:
+            _FILE_IDS[key] = (file_id, time.time())
+    return file_id
 
-    res.raise_for_status()
-    return res.json()["data"]["file_id"]
+
+def upload_temp_attachment(path_to_file):
+    return _upload("attachment", path_to_file)
+
+
+def upload_temp_image(path_to_image):
+    return _upload("image", path_to_image, {"is_photo_id": "1"})
@@ -11,3 +11,93 @@ HEADERS = {
     "Authorization": f"Bearer {TOKEN}",
     "Accept": "*/*",
 }
+
+# keep-alive connection pools (per host: BASE / UPLOAD_BASE)
+POOL_SIZE = int(os.getenv("POOL_SIZE", "32"))
+UPLOAD_POOL_SIZE = int(os.getenv("UPLOAD_POOL_SIZE", "16"))
+
+# print PUT/POST debug blocks (turn off for fleet runs)
+HTTP_DEBUG = os.getenv("HTTP_DEBUG", "1") != "0"
+
+# requests in flight within one application (1 = serial); steps only run
+# side by side when STEP_DEPENDENCIES is set, otherwise just subforms do
+STEP_PARALLELISM = int(os.getenv("STEP_PARALLELISM", "1"))
+
+# ordering the backend needs, as JSON: {"step_code": ["must_run_first", ...]}
+# (the primary applicant is always created first and sign always runs last)
+STEP_DEPENDENCIES = os.getenv("STEP_DEPENDENCIES", "")
+
+# step list lives on the v2 API
+STEP_LIST_URL = os.getenv("STEP_LIST_URL", "http://dev-api-ipm.cdc.gov.kh/api/v2/step")
+
+# persistent schema store (step list, enums, step / subform schemas)
+SCHEMA_STORE = os.getenv("SCHEMA_STORE", "1") != "0"
+SCHEMA_STORE_DIR = os.getenv("SCHEMA_STORE_DIR", ".cache/schema_store")
+SCHEMA_TTL = int(os.getenv("SCHEMA_TTL", "3600"))
+
+# cascading-select options (/formdata/invt/dependency_option), shared per process
+DEP_OPTION_CACHE_SIZE = int(os.getenv("DEP_OPTION_CACHE_SIZE", "4096"))
+DEP_OPTION_TTL = int(os.getenv("DEP_OPTION_TTL", "3600"))
+DEP_OPTION_PREFETCH = os.getenv("DEP_OPTION_PREFETCH", "0") == "1"
+
+# upload variants of the test assets (0 = send the original files)
+ASSET_MAX_SIDE = int(os.getenv("ASSET_MAX_SIDE", "0"))
+ASSET_MAX_BYTES = int(os.getenv("ASSET_MAX_BYTES", "0"))
+
+# reuse temp file ids for identical bytes across applications; opt-in, the
+# backend has not confirmed a temp file id may be attached more than once
+UPLOAD_DEDUP = os.getenv("UPLOAD_DEDUP", "0") == "1"
+UPLOAD_DEDUP_TTL = int(os.getenv("UPLOAD_DEDUP_TTL", "600"))
+
+# also push the signature through /temp/upload/attachment before signing
+SIGN_TEMP_UPLOAD = os.getenv("SIGN_TEMP_UPLOAD", "0") == "1"
+
+# crash-safe checkpoint journal (SQLite); JOURNAL=0 turns it off
+JOURNAL = os.getenv("JOURNAL", "1") != "0"
+JOURNAL_PATH = os.getenv("JOURNAL_PATH", ".cache/journal.sqlite")
+
+# results ledger (per-application / per-step / per-request timings)
+LEDGER = os.getenv("LEDGER", "1") != "0"
+LEDGER_PATH = os.getenv("LEDGER_PATH", ".cache/ledger.sqlite")
+
+# credential pool: TOKENS="t1,t2,..." and/or TOKEN_FILE (one token per line);
+# falls back to TOKEN. apps are assigned round_robin or least_loaded
+TOKENS = os.getenv("TOKENS", "")
+TOKEN_FILE = os.getenv("TOKEN_FILE", "")
+TOKEN_ASSIGNMENT = os.getenv("TOKEN_ASSIGNMENT", "least_loaded")
+# skip JWTs that expire within this many seconds
+TOKEN_EXPIRY_MARGIN = int(os.getenv("TOKEN_EXPIRY_MARGIN", "60"))
+
+# adaptive rate limiting per endpoint class (read / save / upload / sign) plus
+# a global cap, in requests per second per process; RATE_LIMIT=0 turns it off.
+# RATE_LIMITS overrides the starting rates as JSON, e.g. {"save": 10, "global": 60}
+RATE_LIMIT = os.getenv("RATE_LIMIT", "1") != "0"
+RATE_LIMITS = os.getenv("RATE_LIMITS", "")
+# responses slower than their class target (seconds) count as backpressure;
+# JSON overrides per class, e.g. {"read": 1.5, "upload": 45}
+RATE_LATENCY_TARGETS = os.getenv("RATE_LATENCY_TARGETS", "")
+
+# retries for GETs and .../data/save PUTs (transient errors only)
+RETRY_ATTEMPTS = int(os.getenv("RETRY_ATTEMPTS", "3"))
+RETRY_BASE = float(os.getenv("RETRY_BASE", "0.5"))
+RETRY_MAX = float(os.getenv("RETRY_MAX", "8"))
+# circuit breaker per endpoint: open after N transient failures in a row
+BREAKER_THRESHOLD = int(os.getenv("BREAKER_THRESHOLD", "10"))
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "15"))
+
+# request timeouts: connect, and read per endpoint class (seconds);
+# REQUEST_TIMEOUTS overrides read timeouts as JSON, e.g. {"upload": 300}
+CONNECT_TIMEOUT = float(os.getenv("CONNECT_TIMEOUT", "5"))
+REQUEST_TIMEOUTS = os.getenv("REQUEST_TIMEOUTS", "")
+# wall-clock budget per application in seconds (0 = no deadline)
+APP_DEADLINE = float(os.getenv("APP_DEADLINE", "0"))
+
+# repair 400 validation errors field by field and retry the save;
+# corrections learned per field code are kept in REPAIR_STORE
+REPAIR = os.getenv("REPAIR", "1") != "0"
+REPAIR_ATTEMPTS = int(os.getenv("REPAIR_ATTEMPTS", "2"))
+REPAIR_STORE = os.getenv("REPAIR_STORE", ".cache/corrections.json")
+
+# check payloads against the field schema before saving:
+# repair (fix locally, send anyway if unfixable) / strict (raise) / off
+PREFLIGHT = os.getenv("PREFLIGHT", "repair")
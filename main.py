@@ -1,18 +1,93 @@
-from main_step_runner import run_all_steps
-from api.http import http_get
+import argparse
+import json
 
-
-def create_application():
-    res = http_get("/step/general_info", params={"type": "qip"})
-    return res["data"]["investment_info"]["id"]
+from config import DEP_OPTION_PREFETCH
+from main_step_runner import run_application
 
 
 def main():
-    invt_id = create_application()
-    print("New application:", invt_id)
+    # one application, journaled like every other run so --resume can find it
+    result = run_application()
+    print("\n========== RESULT ==========")
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if not result["ok"]:
+        raise SystemExit(1)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="IPM application bot")
+    parser.add_argument("--count", type=int, default=1, help="applications to create")
+    parser.add_argument("--concurrency", type=int, default=1, help="applications in flight")
+    parser.add_argument("--type", dest="app_type", default="qip", help="application type")
+    parser.add_argument("--processes", type=int, default=0,
+                        help="worker processes for fleet mode (0 = single process)")
+    parser.add_argument("--jobs", help="JSONL job file to stream ('-' for stdin)")
+    parser.add_argument("--output", default="-", help="JSONL result file ('-' for stdout)")
+    parser.add_argument("--profile", help="JSON load profile (ramp / constant / spike / soak)")
+    parser.add_argument("--pipeline", nargs="?", const="",
+                        help="staged create/fill/sign pipeline, e.g. create=2,fill=8,sign=4")
+    parser.add_argument("--queue-size", type=int, default=16, help="pipeline queue size per stage")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue unfinished applications from the journal")
+    return parser.parse_args(argv)
+
+
+def cli(argv=None):
+    args = parse_args(argv)
+
+    # one ledger run id for this invocation, inherited by fleet workers
+    from utils.ledger import run_id
+
+    print("ledger run:", run_id())
+
+    if DEP_OPTION_PREFETCH and not args.processes:
+        from utils.option_cache import prefetch_dependency_options
+
+        print("dependency options prefetched:", prefetch_dependency_options(app_type=args.app_type))
+
+    if args.resume:
+        from runners.resume import resume_all
+
+        summary = resume_all(max(1, args.concurrency))
+        print("\n========== RESUME SUMMARY ==========")
+        print(json.dumps(summary, indent=2, ensure_ascii=False))
+        return
+
+    if args.jobs:
+        from runners.batch import run_batch_cli
+
+        run_batch_cli(args.jobs, args.output, args.concurrency)
+        return
+
+    if args.profile:
+        from runners.load_profile import run_profile_cli
+
+        output = None if args.output == "-" else args.output
+        summary = run_profile_cli(args.profile, output)
+        print("\n========== LOAD PROFILE SUMMARY ==========")
+        print(json.dumps(summary, indent=2, ensure_ascii=False))
+        return
+
+    if (args.count == 1 and args.concurrency == 1 and args.app_type == "qip"
+            and not args.processes and args.pipeline is None):
+        main()
+        return
+
+    if args.pipeline is not None:
+        from runners.pipeline import run_pipeline, parse_workers
+
+        summary = run_pipeline(args.count, parse_workers(args.pipeline), args.queue_size, args.app_type)
+    elif args.processes:
+        from runners.fleet import run_fleet
+
+        summary = run_fleet(args.count, args.processes, max(1, args.concurrency), args.app_type)
+    else:
+        from runners.engine import run
 
-    run_all_steps(invt_id)
+        summary = run(args.count, max(1, args.concurrency), args.app_type)
+    print("\n========== RUN SUMMARY ==========")
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
 
 
 if __name__ == "__main__":
-    main()
+    cli()
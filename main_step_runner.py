@@ -1,23 +1,152 @@
 # run_all_steps.py
 
-import requests
-from config import HEADERS
+import random
+import time
+
+from api.http import http_get, read_cache_stats
+from api import token_pool
+from api.transport import release_app_token
+from config import APP_DEADLINE, STEP_LIST_URL
 from steps.generic_step import submit_generic_step
 from steps.approval_flow import submit_signature
+from steps.step_graph import run_step_graph, load_step_dependencies
+from utils.app_state import (
+    AppState, app_scope, current_app, app_parallelism, check_deadline, remaining_time, set_deadline,
+)
+from utils.applicant import ensure_primary_applicant
+from utils.schema_store import fetch_cached
+from utils import journal, ledger
+from utils.journal import checkpoint
 
+_STEP_LIST_CACHE = None
 
-def run_all_steps(invt_id):
-    res = requests.get("http://dev-api-ipm.cdc.gov.kh/api/v2/step", headers=HEADERS)
-    steps = sorted(res.json()["data"]["qip"], key=lambda x: x.get("step_order", 0))
 
-    print("\n========== START RUNNING ALL STEPS ==========")
+def create_application(app_type="qip"):
+    res = http_get("/step/general_info", params={"type": app_type})
+    return res["data"]["investment_info"]["id"]
+
+
+def load_step_list():
+    global _STEP_LIST_CACHE
+    if _STEP_LIST_CACHE is None:
+        _STEP_LIST_CACHE = fetch_cached("step_list", "all", STEP_LIST_URL)
+    return _STEP_LIST_CACHE
+
+
+def seed_step_list(data):
+    global _STEP_LIST_CACHE
+    _STEP_LIST_CACHE = data
+
 
-    for step in steps:
-        code = step["code"]
+def get_steps(app_type="qip"):
+    return sorted(load_step_list()[app_type], key=lambda x: x.get("step_order", 0))
+
+
+def _think():
+    # optional pause between steps, to mimic a user filling the form
+    state = current_app()
+    if state is None or not state.think_time:
+        return
+    lo, hi = state.think_time
+    pause = (state.rng or random).uniform(lo, hi)
+    left = remaining_time()
+    time.sleep(pause if left is None else max(0.0, min(pause, left)))
+    check_deadline("think time")
+
+
+def fill_all_steps(invt_id, app_type="qip"):
+    steps = get_steps(app_type)
+
+    def run_step(code):
         print(f"\n>>> PROCESSING STEP: {code}")
-        submit_generic_step(invt_id, code)
+        ledger.timed(code, checkpoint, invt_id, f"step:{code}", submit_generic_step, invt_id, code, app_type)
+
+    limit = app_parallelism()
+    dependencies = load_step_dependencies()
+    if limit > 1 and dependencies:
+        # applicant first, then independent steps side by side
+        ensure_primary_applicant(invt_id)
+        first = steps[0]["code"] if steps else None
+
+        def run_step_paced(code):
+            if code != first:
+                _think()
+            run_step(code)
+
+        run_step_graph(steps, run_step_paced, limit, dependencies)
+        return
+
+    # no STEP_DEPENDENCIES graph: the backend ordering is unknown, so steps
+    # stay in step_order (subforms inside a step still fan out up to `limit`)
+    for i, step in enumerate(steps):
+        run_step(step["code"])
+        if i < len(steps) - 1:
+            _think()
+
+
+def run_all_steps(invt_id, app_type="qip"):
+    print("\n========== START RUNNING ALL STEPS ==========")
+
+    fill_all_steps(invt_id, app_type)
 
     # sign at the end
-    submit_signature(invt_id)
+    check_deadline("sign")
+    ledger.timed("sign", checkpoint, invt_id, "sign", submit_signature, invt_id)
 
     print("\n========== ALL STEPS + SIGNATURE COMPLETED ==========")
+
+
+# create + fill + sign one application in its own AppState.
+# never raises: the outcome is returned as a result dict.
+def run_application(app_type="qip", overrides=None, seed=None, think_time=None,
+                    step_parallelism=None, invt_id=None, deadline=None):
+    # invt_id given: resume that application instead of creating a new one;
+    # deadline (seconds, default APP_DEADLINE) bounds the whole run
+    started = time.perf_counter()
+    try:
+        state = AppState(app_type, overrides, seed)
+    except Exception as e:
+        # bad overrides/seed: report it like any other failure
+        return {"type": app_type, "invt_id": None, "ok": False,
+                "error": f"{type(e).__name__}: {e}",
+                "elapsed": round(time.perf_counter() - started, 3)}
+    state.think_time = think_time
+    set_deadline(state, APP_DEADLINE if deadline is None else deadline)
+    if step_parallelism:
+        state.step_parallelism = step_parallelism
+    started_at = time.time()
+    result = {"type": app_type, "invt_id": None, "ok": False, "error": None}
+
+    with app_scope(state):
+        try:
+            if invt_id is None:
+                state.invt_id = ledger.timed("create", create_application, app_type)
+                print("New application:", state.invt_id)
+            else:
+                state.invt_id = invt_id
+                print("Resuming application:", state.invt_id)
+            result["invt_id"] = state.invt_id
+            journal.record_start(state.invt_id, app_type, overrides, seed)
+
+            run_all_steps(state.invt_id, app_type)
+            result["ok"] = True
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+            print("✖ Application failed:", state.invt_id, result["error"])
+
+        # bookkeeping must not raise either (same as the pipeline's finish)
+        try:
+            journal.record_finish(state.invt_id, result["ok"], result["error"])
+        except Exception as e:
+            print("✖ Journal write failed:", state.invt_id, f"{type(e).__name__}: {e}")
+        try:
+            ledger.record_application(state, result["ok"], result["error"], started_at)
+        except Exception as e:
+            print("✖ Ledger write failed:", state.invt_id, f"{type(e).__name__}: {e}")
+        result["account"] = token_pool.mask(state.token)
+        release_app_token(state)
+
+        result["read_cache"] = read_cache_stats()
+
+    result["elapsed"] = round(time.perf_counter() - started, 3)
+    return result
@@ -0,0 +1,115 @@
+# runners/batch.py
+#
+# Streaming batch mode: reads one job per JSONL line from a file or stdin,
+# keeps at most `concurrency` applications in flight and writes one result
+# line per application as soon as it finishes. Memory stays constant no
+# matter how long the input is.
+#
+#   {"id": "a1", "type": "qip", "overrides": {"company_name_en": "ACME"}, "seed": 42}
+
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from main_step_runner import run_application
+
+
+# reject malformed fields here so they become a failed result line instead of
+# blowing up AppState inside a worker
+def _check_job(job):
+    if job.get("type") is not None and not isinstance(job["type"], str):
+        raise ValueError("'type' must be a string")
+    if job.get("overrides") is not None and not isinstance(job["overrides"], dict):
+        raise ValueError("'overrides' must be a JSON object")
+    seed = job.get("seed")
+    if seed is not None and (isinstance(seed, bool) or not isinstance(seed, int)):
+        raise ValueError("'seed' must be an integer")
+
+
+def iter_jobs(stream):
+    for lineno, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        job = None
+        try:
+            job = json.loads(line)
+            if not isinstance(job, dict):
+                raise ValueError("job line must be a JSON object")
+            _check_job(job)
+        except ValueError as e:
+            job_id = job.get("id") if isinstance(job, dict) else None
+            yield lineno, {"id": job_id, "_error": f"bad job line: {e}"}
+            continue
+        yield lineno, job
+
+
+def _run_job(lineno, job):
+    base = {"line": lineno, "id": job.get("id")}
+
+    if "_error" in job:
+        return {**base, "type": None, "invt_id": None, "ok": False,
+                "error": job["_error"], "elapsed": 0.0}
+
+    app_type = job.get("type") or "qip"
+    try:
+        res = run_application(app_type, job.get("overrides"), job.get("seed"))
+    except Exception as e:
+        # one bad job must never take the whole batch down
+        res = {"type": app_type, "invt_id": None, "ok": False,
+               "error": f"{type(e).__name__}: {e}", "elapsed": 0.0}
+    return {**base, "seed": job.get("seed"), **res}
+
+
+def _write(out, result):
+    out.write(json.dumps(result, ensure_ascii=False) + "\n")
+    out.flush()
+
+
+def run_batch(stream, out, concurrency=1):
+    concurrency = max(1, concurrency)
+    counts = {"total": 0, "ok": 0, "failed": 0}
+    in_flight = set()
+
+    def drain(done):
+        for fut in done:
+            res = fut.result()
+            counts["total"] += 1
+            counts["ok" if res["ok"] else "failed"] += 1
+            _write(out, res)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="ipm-batch") as pool:
+        for lineno, job in iter_jobs(stream):
+            if len(in_flight) >= concurrency:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                drain(done)
+            in_flight.add(pool.submit(_run_job, lineno, job))
+
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            drain(done)
+
+    return counts
+
+
+def run_batch_cli(jobs_path, output_path="-", concurrency=1):
+    from contextlib import ExitStack, redirect_stdout
+
+    with ExitStack() as stack:
+        if jobs_path == "-":
+            stream = sys.stdin
+        else:
+            stream = stack.enter_context(open(jobs_path, encoding="utf-8"))
+
+        if output_path == "-":
+            # results own stdout; the step-by-step chatter goes to stderr
+            out = sys.stdout
+            stack.enter_context(redirect_stdout(sys.stderr))
+        else:
+            out = stack.enter_context(open(output_path, "a", encoding="utf-8"))
+
+        counts = run_batch(stream, out, concurrency)
+
+    print(f"batch done: {counts['total']} applications, "
+          f"{counts['ok']} ok, {counts['failed']} failed", file=sys.stderr)
+    return counts
@@ -0,0 +1,256 @@
+# runners/coordinator.py
+#
+# Coordinator / worker mode for spreading application runs over several
+# machines. The protocol is newline-delimited JSON over plain TCP:
+#
+#   worker -> {"op": "next"}                       ask for a job
+#   coord  -> {"op": "job", "job_id", "type", "overrides"}
+#          |  {"op": "wait"}                       nothing free right now
+#          |  {"op": "done"}                       no more work
+#   worker -> {"op": "result", "job_id", "invt_id", "ok", "error", "elapsed"}
+#
+# Jobs handed to a worker that disconnects before reporting are requeued.
+#
+#   python -m runners.coordinator serve --jobs jobs.jsonl --port 9100
+#   python -m runners.coordinator work --host 10.0.0.5 --port 9100 --concurrency 4
+
+import argparse
+import json
+import socket
+import socketserver
+import sys
+import threading
+import time
+from collections import deque
+
+
+def _send(wfile, msg):
+    wfile.write((json.dumps(msg, ensure_ascii=False) + "\n").encode("utf-8"))
+    wfile.flush()
+
+
+def _recv(rfile):
+    line = rfile.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+# -------------------------------------------------------
+# JOBS
+# -------------------------------------------------------
+def expand_jobs(jobs):
+    # {"type", "count", "overrides"} -> one unit per application
+    units = []
+    for job in jobs:
+        for _ in range(int(job.get("count", 1))):
+            units.append({
+                "type": job.get("type") or "qip",
+                "overrides": job.get("overrides") or {},
+            })
+    for i, unit in enumerate(units):
+        unit["job_id"] = i
+    return units
+
+
+def load_jobs(path):
+    with open(path, encoding="utf-8") as f:
+        text = f.read().strip()
+    if text.startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+# -------------------------------------------------------
+# COORDINATOR
+# -------------------------------------------------------
+class Coordinator:
+    def __init__(self, units, out=None):
+        self.pending = deque(units)
+        self.total = len(units)
+        self.in_flight = {}
+        self.results = []
+        self.out = out or sys.stdout
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+        self.started = time.perf_counter()
+        if not units:
+            self.finished.set()
+
+    def next_job(self, owner):
+        with self.lock:
+            if self.pending:
+                unit = self.pending.popleft()
+                self.in_flight[unit["job_id"]] = (owner, unit, time.perf_counter())
+                return {"op": "job", **unit}
+            if self.in_flight:
+                return {"op": "wait"}
+            return {"op": "done"}
+
+    def record(self, msg):
+        with self.lock:
+            entry = self.in_flight.pop(msg.get("job_id"), None)
+            if entry is None:
+                return
+            _, unit, handed_out = entry
+            res = {
+                "job_id": unit["job_id"],
+                "type": unit["type"],
+                "invt_id": msg.get("invt_id"),
+                "ok": bool(msg.get("ok")),
+                "error": msg.get("error"),
+                "elapsed": msg.get("elapsed"),
+                "roundtrip": round(time.perf_counter() - handed_out, 3),
+                "worker": msg.get("worker"),
+            }
+            self.results.append(res)
+            self.out.write(json.dumps(res, ensure_ascii=False) + "\n")
+            self.out.flush()
+            if len(self.results) == self.total:
+                self.finished.set()
+
+    def requeue(self, owner):
+        with self.lock:
+            lost = [jid for jid, (o, _, _) in self.in_flight.items() if o == owner]
+            for jid in lost:
+                _, unit, _ = self.in_flight.pop(jid)
+                self.pending.appendleft(unit)
+            if lost:
+                print(f"worker {owner} dropped, requeued {len(lost)} job(s)", file=sys.stderr)
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        ok = [r for r in self.results if r["ok"]]
+        return {
+            "total": self.total,
+            "ok": len(ok),
+            "failed": len(self.results) - len(ok),
+            "elapsed": round(elapsed, 3),
+            "apps_per_sec": round(len(self.results) / elapsed, 3) if elapsed else None,
+            "invt_ids": [r["invt_id"] for r in ok],
+            "errors": [
+                {"job_id": r["job_id"], "invt_id": r["invt_id"], "error": r["error"]}
+                for r in self.results if not r["ok"]
+            ],
+        }
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        coord = self.server.coordinator
+        owner = f"{self.client_address[0]}:{self.client_address[1]}"
+        try:
+            while True:
+                msg = _recv(self.rfile)
+                if msg is None:
+                    break
+                op = msg.get("op")
+                if op == "next":
+                    _send(self.wfile, coord.next_job(owner))
+                elif op == "result":
+                    coord.record(msg)
+                else:
+                    _send(self.wfile, {"op": "error", "error": f"unknown op: {op}"})
+        except (OSError, ValueError):
+            pass
+        finally:
+            coord.requeue(owner)
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def serve(units, host="0.0.0.0", port=9100, out=None):
+    coord = Coordinator(units, out)
+    server = _Server((host, port), _Handler)
+    server.coordinator = coord
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    print(f"coordinator listening on {host}:{server.server_address[1]} ({coord.total} jobs)",
+          file=sys.stderr)
+    try:
+        coord.finished.wait()
+    finally:
+        server.shutdown()
+        server.server_close()
+    return coord.summary()
+
+
+# -------------------------------------------------------
+# WORKER
+# -------------------------------------------------------
+def _work_loop(host, port, name, poll_interval=0.5):
+    from main_step_runner import run_application
+
+    with socket.create_connection((host, port)) as sock:
+        rfile = sock.makefile("rb")
+        wfile = sock.makefile("wb")
+        while True:
+            _send(wfile, {"op": "next"})
+            msg = _recv(rfile)
+            if msg is None or msg.get("op") == "done":
+                return
+            if msg.get("op") == "wait":
+                time.sleep(poll_interval)
+                continue
+            if msg.get("op") != "job":
+                raise Exception(f"unexpected message from coordinator: {msg}")
+
+            res = run_application(msg["type"], msg.get("overrides"))
+            _send(wfile, {
+                "op": "result",
+                "job_id": msg["job_id"],
+                "invt_id": res["invt_id"],
+                "ok": res["ok"],
+                "error": res["error"],
+                "elapsed": res["elapsed"],
+                "worker": name,
+            })
+
+
+def work(host, port, concurrency=1):
+    name = f"{socket.gethostname()}:{threading.get_native_id()}"
+    threads = [
+        threading.Thread(target=_work_loop, args=(host, port, f"{name}/{i}"))
+        for i in range(max(1, concurrency))
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="IPM coordinator / worker")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_serve = sub.add_parser("serve", help="hand out jobs and collect results")
+    p_serve.add_argument("--host", default="0.0.0.0")
+    p_serve.add_argument("--port", type=int, default=9100)
+    p_serve.add_argument("--jobs", help="JSON list or JSONL of {type, count, overrides}")
+    p_serve.add_argument("--type", dest="app_type", default="qip")
+    p_serve.add_argument("--count", type=int, default=1)
+
+    p_work = sub.add_parser("work", help="pull jobs from a coordinator and run them")
+    p_work.add_argument("--host", default="127.0.0.1")
+    p_work.add_argument("--port", type=int, default=9100)
+    p_work.add_argument("--concurrency", type=int, default=1)
+
+    args = parser.parse_args(argv)
+
+    if args.cmd == "serve":
+        jobs = load_jobs(args.jobs) if args.jobs else [{"type": args.app_type, "count": args.count}]
+        summary = serve(expand_jobs(jobs), args.host, args.port)
+        print(json.dumps(summary, indent=2, ensure_ascii=False), file=sys.stderr)
+    else:
+        from api.http import set_http_debug
+
+        set_http_debug(False)
+        work(args.host, args.port, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
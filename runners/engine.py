@@ -0,0 +1,73 @@
+# runners/engine.py
+#
+# Concurrent engine: keeps up to `concurrency` applications in flight from a
+# single process. The whole step flow (resolver, uploads, saves, the pooled
+# requests.Session) is blocking code, so each in-flight application holds one
+# worker thread. This is deliberately not an asyncio engine: that would need an
+# async HTTP client (none in this tree) and a second, async copy of the step
+# flow. Applications are submitted as slots free up, never all at once, so
+# `count` can be large.
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from api.rate_limit import rate_limit_stats
+from api.resilience import circuit_stats
+from main_step_runner import run_application
+from utils.preflight import preflight_stats
+
+
+def run_applications(count, concurrency, app_type="qip", on_result=None):
+    results = []
+    concurrency = max(1, concurrency)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="ipm-app") as pool:
+        running = {}
+        submitted = 0
+        while submitted < count or running:
+            while submitted < count and len(running) < concurrency:
+                running[pool.submit(run_application, app_type)] = submitted
+                submitted += 1
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                res = fut.result()
+                res["index"] = running.pop(fut)
+                results.append(res)
+                if on_result:
+                    on_result(res)
+
+    return results
+
+
+def _per_account(results):
+    counts = {}
+    for r in results:
+        key = r.get("account")
+        if key:
+            counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def summarize(results, elapsed):
+    ok = [r for r in results if r["ok"]]
+    failed = [r for r in results if not r["ok"]]
+    return {
+        "total": len(results),
+        "ok": len(ok),
+        "failed": len(failed),
+        "elapsed": round(elapsed, 3),
+        "apps_per_sec": round(len(results) / elapsed, 3) if elapsed else None,
+        "invt_ids": [r["invt_id"] for r in ok],
+        "errors": [{"invt_id": r["invt_id"], "error": r["error"]} for r in failed],
+        "accounts": _per_account(results),
+        "rate_limits": rate_limit_stats(),
+        "circuits": circuit_stats(),
+        "preflight": preflight_stats(),
+    }
+
+
+def run(count, concurrency, app_type="qip"):
+    started = time.perf_counter()
+    results = run_applications(count, concurrency, app_type)
+    return summarize(results, time.perf_counter() - started)
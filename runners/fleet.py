@@ -0,0 +1,89 @@
+# runners/fleet.py
+#
+# Multi-process fleet: the parent warms the shared caches once (enum index,
+# step list, dependency options), then a pool of worker processes each runs its slice of the
+# target count on the thread engine (runners/engine.py). Results are merged into one summary.
+
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from api import token_pool
+from api.http import set_http_debug
+from api.transport import reset_session
+from main_step_runner import load_step_list, seed_step_list
+from runners.engine import run_applications, summarize
+from utils.assets import scan
+from utils.enum_index import EnumIndex, get_enum_index, seed_enum_index
+from utils.option_cache import export_options, seed_options, prefetch_dependency_options
+from config import DEP_OPTION_PREFETCH
+
+
+def split_count(count, parts):
+    base, extra = divmod(count, parts)
+    return [base + (1 if i < extra else 0) for i in range(parts)]
+
+
+def _init_worker(enum_index_path, step_list, options, http_debug):
+    # never reuse sockets / RNG state inherited from the parent on fork
+    reset_session()
+    token_pool.reset_pool()
+    random.seed()
+    seed_enum_index(EnumIndex.load(enum_index_path))
+    seed_step_list(step_list)
+    seed_options(options)
+    set_http_debug(http_debug)
+
+
+def _run_slice(worker_no, count, concurrency, app_type):
+    results = run_applications(count, concurrency, app_type)
+    for r in results:
+        r["worker"] = worker_no
+        r["pid"] = os.getpid()
+    return results
+
+
+def run_fleet(count, processes=None, concurrency=1, app_type="qip", http_debug=False):
+    processes = max(1, min(processes or os.cpu_count() or 1, count))
+
+    # workers read the enum index file instead of downloading the blob
+    fd, enum_index_path = tempfile.mkstemp(prefix="ipm-enum-", suffix=".idx")
+    os.close(fd)
+    get_enum_index().save(enum_index_path)
+
+    step_list = load_step_list()
+    # load the test assets once; forked workers inherit the bytes
+    scan()
+    if DEP_OPTION_PREFETCH:
+        prefetch_dependency_options(app_type=app_type)
+
+    started = time.perf_counter()
+    results = []
+    failures = []
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=_init_worker,
+            initargs=(enum_index_path, step_list, export_options(), http_debug),
+        ) as pool:
+            futures = {
+                pool.submit(_run_slice, i, n, concurrency, app_type): i
+                for i, n in enumerate(split_count(count, processes))
+                if n
+            }
+            for fut in as_completed(futures):
+                try:
+                    results.extend(fut.result())
+                except Exception as e:
+                    # a worker process died: its whole slice is lost
+                    failures.append({"worker": futures[fut], "error": f"{type(e).__name__}: {e}"})
+    finally:
+        os.remove(enum_index_path)
+
+    summary = summarize(results, time.perf_counter() - started)
+    summary["processes"] = processes
+    summary["worker_failures"] = failures
+    return summary
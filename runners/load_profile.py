@@ -0,0 +1,273 @@
+# runners/load_profile.py
+#
+# Open-loop load generator. A profile declares the arrival rate over time
+# (ramp / constant / spike / soak stages), a weighted mix of application
+# types and optional think time between steps. Arrivals are dispatched on
+# schedule whether or not earlier applications have finished, so a slow
+# backend shows up as growing in-flight work instead of a lower offered load.
+#
+# Arrival times come from integrating the rate curve (one arrival per unit
+# of accumulated rate, centred in that unit, or an exponential draw of it for
+# poisson), so ramps from 0 and short spikes get the arrivals their area says
+# they should: 4/s for 2s is 8 arrivals, a 0 -> 10/s ramp over 60s is 300.
+# A soak stage offers a constant rate like `constant`, and its summary also
+# compares latency at the start and the end of the stage to show drift.
+#
+# {
+#   "stages": [
+#     {"kind": "ramp", "from": 0.5, "to": 5, "duration": 60},
+#     {"kind": "constant", "rate": 5, "duration": 300},
+#     {"kind": "spike", "rate": 5, "peak": 20, "every": 60, "length": 10, "duration": 300},
+#     {"kind": "soak", "rate": 2, "duration": 3600}
+#   ],
+#   "mix": {"qip": 3, "fdi": 1},
+#   "think_time": [0.5, 2.0],
+#   "arrival": "poisson",
+#   "max_in_flight": 500
+# }
+
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from api.rate_limit import rate_limit_stats
+from main_step_runner import run_application
+
+STAGE_KINDS = ("ramp", "constant", "spike", "soak")
+
+
+# -------------------------------------------------------
+# PROFILE
+# -------------------------------------------------------
+def load_profile(path):
+    with open(path, encoding="utf-8") as f:
+        profile = json.load(f)
+    validate_profile(profile)
+    return profile
+
+
+def validate_profile(profile):
+    stages = profile.get("stages") or []
+    if not stages:
+        raise Exception("load profile has no stages")
+    for i, st in enumerate(stages):
+        kind = st.get("kind")
+        if kind not in STAGE_KINDS:
+            raise Exception(f"stage {i}: unknown kind {kind!r} (expected one of {STAGE_KINDS})")
+        if float(st.get("duration", 0)) <= 0:
+            raise Exception(f"stage {i}: duration must be > 0")
+    mix = profile.get("mix") or {"qip": 1}
+    if not any(float(w) > 0 for w in mix.values()):
+        raise Exception("load profile mix has no positive weight")
+
+
+def _stage_rate(stage, t):
+    # arrivals/sec, t = seconds since the stage started
+    kind = stage["kind"]
+    if kind == "ramp":
+        lo = float(stage.get("from", 0))
+        hi = float(stage.get("to", lo))
+        return lo + (hi - lo) * min(1.0, t / float(stage["duration"]))
+    if kind == "spike":
+        base = float(stage.get("rate", 0))
+        every = float(stage.get("every", stage["duration"]))
+        length = float(stage.get("length", 0))
+        return float(stage.get("peak", base)) if (t % every) < length else base
+    return float(stage.get("rate", 0))
+
+
+def rate_at(profile, t):
+    # (stage index, rate) at t seconds since the run started, None when over
+    start = 0.0
+    for i, stage in enumerate(profile["stages"]):
+        end = start + float(stage["duration"])
+        if t < end:
+            return i, _stage_rate(stage, t - start)
+        start = end
+    return None
+
+
+def next_arrival(profile, t, need, step=0.05):
+    # time at which the rate integrated from t reaches `need`, None past the
+    # end; integrated over a fixed grid of `step` cells, each at its midpoint,
+    # so float drift never moves a sample across a stage or spike edge
+    end = total_duration(profile)
+    k = int(t / step)
+    while t < end:
+        lo, hi = k * step, min((k + 1) * step, end)
+        k += 1
+        if hi <= t:
+            continue
+        rate = rate_at(profile, (lo + hi) / 2)[1]
+        if rate > 0 and rate * (hi - t) >= need:
+            at = t + need / rate
+            return at if at < end else None
+        need -= rate * (hi - t)
+        t = hi
+    return None
+
+
+def total_duration(profile):
+    return sum(float(st["duration"]) for st in profile["stages"])
+
+
+def pick_type(mix, rng=random):
+    types = list(mix)
+    return rng.choices(types, weights=[float(mix[t]) for t in types], k=1)[0]
+
+
+def _think_time(profile):
+    tt = profile.get("think_time")
+    if tt in (None, 0, [0, 0]):
+        return None
+    if isinstance(tt, (int, float)):
+        return (float(tt), float(tt))
+    return (float(tt[0]), float(tt[1]))
+
+
+# -------------------------------------------------------
+# SCHEDULER
+# -------------------------------------------------------
+class _StageStats:
+    def __init__(self):
+        self.dispatched = 0
+        self.dropped = 0
+        self.ok = 0
+        self.failed = 0
+        self.latencies = []
+        self.timeline = []  # (dispatched at, latency) for soak drift
+        self.max_lag = 0.0
+        self.limits = {}
+
+
+def _limits_now():
+    # adaptive rate limits (req/s) as they stand at the end of a stage
+    return {name: b["rate"] for name, b in rate_limit_stats().items()}
+
+
+def _pct(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    k = min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))
+    return round(values[k], 3)
+
+
+def run_profile(profile, out=None, tick=0.1):
+    # tick: integration step of the rate curve (halved)
+    validate_profile(profile)
+    mix = profile.get("mix") or {"qip": 1}
+    think = _think_time(profile)
+    poisson = profile.get("arrival", "uniform") == "poisson"
+    max_in_flight = int(profile.get("max_in_flight", 256))
+
+    stats = [_StageStats() for _ in profile["stages"]]
+    lock = threading.Lock()
+    in_flight = [0]
+    rng = random.Random(profile.get("seed"))
+
+    def job(stage_no, app_type, at):
+        res = run_application(app_type, think_time=think)
+        with lock:
+            in_flight[0] -= 1
+            st = stats[stage_no]
+            st.ok += res["ok"]
+            st.failed += not res["ok"]
+            st.latencies.append(res["elapsed"])
+            st.timeline.append((at, res["elapsed"]))
+            if out:
+                res["stage"] = stage_no
+                out.write(json.dumps(res, ensure_ascii=False) + "\n")
+                out.flush()
+
+    def draw():
+        return rng.expovariate(1.0) if poisson else 1.0
+
+    started = time.perf_counter()
+    # uniform: the first arrival sits half a unit in, so every arrival is
+    # centred in its unit of area and the last one lands inside the run
+    next_at = next_arrival(profile, 0.0, draw() if poisson else 0.5, tick / 2)
+    last_stage = None
+
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="ipm-load") as pool:
+        while next_at is not None:
+            stage_no = rate_at(profile, next_at)[0]
+            if stage_no != last_stage:
+                if last_stage is not None:
+                    stats[last_stage].limits = _limits_now()
+                last_stage = stage_no
+
+            now = time.perf_counter() - started
+            if next_at > now:
+                time.sleep(next_at - now)
+                now = time.perf_counter() - started
+
+            st = stats[stage_no]
+            st.max_lag = max(st.max_lag, now - next_at)
+
+            with lock:
+                full = in_flight[0] >= max_in_flight
+                if not full:
+                    in_flight[0] += 1
+            if full:
+                # open loop: never wait for the backend, count the miss instead
+                st.dropped += 1
+            else:
+                st.dispatched += 1
+                pool.submit(job, stage_no, pick_type(mix, rng), next_at)
+
+            next_at = next_arrival(profile, next_at, draw(), tick / 2)
+
+    elapsed = time.perf_counter() - started
+    if last_stage is not None:
+        stats[last_stage].limits = _limits_now()
+    return _summary(profile, stats, elapsed)
+
+
+def _drift(timeline):
+    # p50 latency of the first and last tenth of a soak stage
+    if len(timeline) < 10:
+        return None
+    timeline = sorted(timeline)
+    n = max(1, len(timeline) // 10)
+    first = _pct([lat for _, lat in timeline[:n]], 50)
+    last = _pct([lat for _, lat in timeline[-n:]], 50)
+    return {"p50_first": first, "p50_last": last,
+            "ratio": round(last / first, 3) if first else None}
+
+
+def _summary(profile, stats, elapsed):
+    stages = []
+    for stage, st in zip(profile["stages"], stats):
+        duration = float(stage["duration"])
+        row = {
+            "kind": stage["kind"],
+            "duration": duration,
+            "dispatched": st.dispatched,
+            "offered_rps": round(st.dispatched / duration, 3),
+            "dropped": st.dropped,
+            "ok": st.ok,
+            "failed": st.failed,
+            "p50": _pct(st.latencies, 50),
+            "p95": _pct(st.latencies, 95),
+            "p99": _pct(st.latencies, 99),
+            "max_dispatch_lag": round(st.max_lag, 3),
+            "rate_limits": st.limits,
+        }
+        if stage["kind"] == "soak":
+            row["drift"] = _drift(st.timeline)
+        stages.append(row)
+    return {"elapsed": round(elapsed, 3), "stages": stages}
+
+
+def run_profile_cli(profile_path, output_path=None):
+    profile = load_profile(profile_path)
+    print(f"load profile: {len(profile['stages'])} stage(s), "
+          f"{total_duration(profile):.0f}s total", file=sys.stderr)
+    if output_path:
+        with open(output_path, "a", encoding="utf-8") as out:
+            return run_profile(profile, out)
+    return run_profile(profile)
@@ -0,0 +1,205 @@
+# runners/pipeline.py
+#
+# Staged pipeline: create -> fill -> sign, each stage with its own worker
+# pool and a bounded queue in front of it. Slow stages no longer hold up
+# fast ones (e.g. upload-heavy signing overlaps with form filling for other
+# applications), and per-stage stats show where the bottleneck is.
+
+import queue
+import threading
+import time
+
+from api import token_pool
+from api.rate_limit import rate_limit_stats
+from api.transport import release_app_token
+from main_step_runner import create_application, fill_all_steps
+from steps.approval_flow import submit_signature
+from config import APP_DEADLINE
+from utils.app_state import AppState, app_scope, check_deadline, set_deadline
+from utils import journal, ledger
+from utils.journal import checkpoint
+
+_STOP = object()
+
+DEFAULT_WORKERS = {"create": 2, "fill": 8, "sign": 4}
+
+
+def _create(state):
+    set_deadline(state, APP_DEADLINE)
+    state.invt_id = ledger.timed("create", create_application, state.app_type)
+    print("New application:", state.invt_id)
+    journal.record_start(state.invt_id, state.app_type, state.overrides, state.seed)
+
+
+def _fill(state):
+    check_deadline("fill")
+    fill_all_steps(state.invt_id, state.app_type)
+
+
+def _sign(state):
+    check_deadline("sign")
+    ledger.timed("sign", checkpoint, state.invt_id, "sign", submit_signature, state.invt_id)
+
+
+class _Stage:
+    def __init__(self, name, fn, workers, queue_size):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.inbox = queue.Queue(maxsize=max(1, queue_size))
+        self.next = None
+        self.lock = threading.Lock()
+        self.alive = self.workers
+        self.processed = 0
+        self.failed = 0
+        self.busy = 0.0
+        self.depth_samples = []
+
+    def loop(self, results):
+        while True:
+            item = self.inbox.get()
+            if item is _STOP:
+                with self.lock:
+                    self.alive -= 1
+                    last = self.alive == 0
+                if last and self.next is not None:
+                    for _ in range(self.next.workers):
+                        self.next.inbox.put(_STOP)
+                return
+
+            state, record = item
+            started = time.perf_counter()
+            try:
+                with app_scope(state):
+                    self.fn(state)
+                ok = True
+            except Exception as e:
+                ok = False
+                record["ok"] = False
+                record["error"] = f"{self.name}: {type(e).__name__}: {e}"
+                print(f"✖ [{self.name}] failed:", state.invt_id, record["error"])
+            spent = time.perf_counter() - started
+
+            record["stages"][self.name] = round(spent, 3)
+            with self.lock:
+                self.busy += spent
+                self.processed += ok
+                self.failed += not ok
+
+            if ok and self.next is not None:
+                self.next.inbox.put((state, record))
+            else:
+                self.finish(state, record, ok, results)
+
+    def finish(self, state, record, ok, results):
+        # always puts the record: run_pipeline blocks on results.get()
+        try:
+            try:
+                journal.record_finish(state.invt_id, ok, record["error"])
+                ledger.record_application(state, ok and record["ok"], record["error"], record["_started_at"])
+            finally:
+                record["account"] = token_pool.mask(state.token)
+                release_app_token(state)
+        except Exception as e:
+            print(f"✖ [{self.name}] bookkeeping failed:", state.invt_id, f"{type(e).__name__}: {e}")
+        finally:
+            record["invt_id"] = state.invt_id
+            record["ok"] = ok and record["ok"]
+            record["elapsed"] = round(time.perf_counter() - record["_started"], 3)
+            del record["_started"], record["_started_at"]
+            results.put(record)
+
+    def stats(self, elapsed):
+        depths = self.depth_samples or [0]
+        return {
+            "workers": self.workers,
+            "processed": self.processed,
+            "failed": self.failed,
+            "throughput": round(self.processed / elapsed, 3) if elapsed else None,
+            "utilization": round(self.busy / (self.workers * elapsed), 3) if elapsed else None,
+            "avg_queue_depth": round(sum(depths) / len(depths), 2),
+            "max_queue_depth": max(depths),
+        }
+
+
+def run_pipeline(count, workers=None, queue_size=16, app_type="qip",
+                 on_result=None, sample_interval=0.2):
+    sizes = {**DEFAULT_WORKERS, **(workers or {})}
+    stages = [
+        _Stage("create", _create, sizes["create"], queue_size),
+        _Stage("fill", _fill, sizes["fill"], queue_size),
+        _Stage("sign", _sign, sizes["sign"], queue_size),
+    ]
+    for a, b in zip(stages, stages[1:]):
+        a.next = b
+
+    results = queue.Queue()
+    started = time.perf_counter()
+    done = threading.Event()
+
+    threads = [
+        threading.Thread(target=st.loop, args=(results,), name=f"ipm-{st.name}-{i}", daemon=True)
+        for st in stages
+        for i in range(st.workers)
+    ]
+    for t in threads:
+        t.start()
+
+    def sample():
+        while not done.wait(sample_interval):
+            for st in stages:
+                st.depth_samples.append(st.inbox.qsize())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+
+    def feed():
+        for _ in range(count):
+            record = {"type": app_type, "invt_id": None, "ok": True, "error": None,
+                      "stages": {}, "_started": time.perf_counter(), "_started_at": time.time()}
+            stages[0].inbox.put((AppState(app_type), record))
+        for _ in range(stages[0].workers):
+            stages[0].inbox.put(_STOP)
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+
+    collected = []
+    for _ in range(count):
+        res = results.get()
+        collected.append(res)
+        if on_result:
+            on_result(res)
+
+    for t in threads:
+        t.join()
+    done.set()
+    sampler.join()
+
+    elapsed = time.perf_counter() - started
+    ok = [r for r in collected if r["ok"]]
+    return {
+        "total": len(collected),
+        "ok": len(ok),
+        "failed": len(collected) - len(ok),
+        "elapsed": round(elapsed, 3),
+        "apps_per_sec": round(len(collected) / elapsed, 3) if elapsed else None,
+        "stages": {st.name: st.stats(elapsed) for st in stages},
+        "rate_limits": rate_limit_stats(),
+        "invt_ids": [r["invt_id"] for r in ok],
+        "errors": [{"invt_id": r["invt_id"], "error": r["error"]} for r in collected if not r["ok"]],
+    }
+
+
+def parse_workers(spec):
+    # "create=2,fill=8,sign=4" -> {"create": 2, "fill": 8, "sign": 4}
+    sizes = {}
+    for part in (spec or "").split(","):
+        if not part.strip():
+            continue
+        name, _, n = part.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_WORKERS:
+            raise Exception(f"unknown pipeline stage: {name!r}")
+        sizes[name] = int(n)
+    return sizes
@@ -0,0 +1,36 @@
+# runners/resume.py
+#
+# --resume: pick up every application the journal has not marked done and
+# continue it at its first incomplete step (completed steps, subform saves
+# and the signature are skipped).
+
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from main_step_runner import run_application
+from runners.engine import summarize
+from utils.journal import unfinished_applications
+
+
+def resume_all(concurrency=1, limit=None):
+    pending = unfinished_applications(limit)
+    print(f"resuming {len(pending)} unfinished application(s)")
+
+    started = time.perf_counter()
+    results = []
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="ipm-resume") as pool:
+        futures = [
+            pool.submit(
+                run_application,
+                app["type"],
+                app["overrides"],
+                app["seed"],
+                invt_id=app["invt_id"],
+            )
+            for app in pending
+        ]
+        for fut in as_completed(futures):
+            results.append(fut.result())
+
+    return summarize(results, time.perf_counter() - started)
@@ -1,32 +1,65 @@
-import requests
-from api.http import http_get     
+import io
+import threading
+
+from urllib3.filepost import encode_multipart_formdata
+
+from api.http import http_get, http_debug
+from api.errors import raise_for_response
+from api.transport import request
 from api.upload import upload_temp_attachment
 from utils.random_data import random_signature_file
-from config import BASE, TOKEN     
+from utils.assets import upload_variant
+from config import BASE, SIGN_TEMP_UPLOAD
+
+# sha256 of the signature bytes -> (multipart body, content type)
+_SIGN_BODIES = {}
+_SIGN_LOCK = threading.Lock()
+
 
+def _sign_body(asset):
+    # encoded once per signature asset, reused for every application
+    with _SIGN_LOCK:
+        cached = _SIGN_BODIES.get(asset.digest)
+    if cached is not None:
+        return cached
 
-def submit_signature(invt_id):
+    body, content_type = encode_multipart_formdata(
+        {"file": (asset.name, asset.data, asset.mime)}
+    )
+    with _SIGN_LOCK:
+        _SIGN_BODIES.setdefault(asset.digest, (body, content_type))
+    return body, content_type
+
+
+def submit_signature(invt_id, temp_upload=None):
     http_get(f"/invt/{invt_id}/confirmation")
     
     signature_path = random_signature_file()
-    signature_file_id = upload_temp_attachment(signature_path)
 
-    with open(signature_path, "rb") as f:
-        files = {"file": f}
+    # the sign PUT carries the file itself; the temp upload is optional
+    use_temp = SIGN_TEMP_UPLOAD if temp_upload is None else temp_upload
+    if use_temp:
+        upload_temp_attachment(signature_path)
+
+    asset = upload_variant(signature_path)
+    body, content_type = _sign_body(asset)
 
-        res = requests.put(
-            f"{BASE}/invt/{invt_id}/application/sign?",
-            headers={"Authorization": f"Bearer {TOKEN}"},  
-            files=files,
-        )
+    # a file-like body is streamed from the cached bytes, never re-encoded
+    res = request(
+        "PUT",
+        f"{BASE}/invt/{invt_id}/application/sign?",
+        data=io.BytesIO(body),
+        headers={"Content-Type": content_type, "Content-Length": str(len(body))},
+    )
 
-    print("==================== SIGN DEBUG ====================")
-    print("URL:", res.request.url)
-    print("STATUS:", res.status_code)
-    print("RESPONSE:", res.text)
-    print("===================================================")
+    if http_debug():
+        print("==================== SIGN DEBUG ====================")
+        print("URL:", res.request.url)
+        print("STATUS:", res.status_code)
+        print("RESPONSE:", res.text)
+        print("===================================================")
 
-    res.raise_for_status()
+    raise_for_response(res)
 
     print("✔ Signature completed for:", invt_id)
     return True
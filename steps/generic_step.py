@@ -1,9 +1,14 @@
 # steps/generic_step.py
 
-from api.http import http_get, http_put
-from utils.schema_payload import build_payload, _iter_fields
-from utils.random_data import generic_value_resolver
+from api.errors import ClientError, ValidationError
+from api.http import http_get
+from utils.resolver_plan import compile_plan, build_planned_payload
 from utils.applicant import ensure_primary_applicant
+from utils.app_state import field_overrides, parallel_map, current_app_type, check_deadline
+from utils.schema_store import cached_schema, remember_schema
+from utils.journal import checkpoint
+from utils.repair import save_with_repair
+from steps.step_plan import derive_step_plan, load_step_plan, record_step_plan, drop_step_plan
 
 
 # -------------------------------------------------------
@@ -11,8 +16,7 @@ from utils.applicant import ensure_primary_applicant
 # -------------------------------------------------------
 def build_auto_overrides(invt_id, detail):
     overrides = {}
-    fields = list(_iter_fields(detail))
-    codes = [f.get("code") for f in fields if f.get("code")]
+    codes = compile_plan(detail).codes
 
     if any("invt_applicant_people_information_id" in c for c in codes):
         applicant_id = ensure_primary_applicant(invt_id)
@@ -20,6 +24,7 @@ def build_auto_overrides(invt_id, detail):
             if "invt_applicant_people_information_id" in c:
                 overrides[c] = applicant_id
 
+    overrides.update(field_overrides(codes))
     return overrides
 
 
@@ -27,6 +32,7 @@ def build_auto_overrides(invt_id, detail):
 # PROCESS A SINGLE SUBFORM
 # -------------------------------------------------------
 def _process_subform(invt_id, subform):
+    check_deadline(f"subform:{subform}")
     sf = http_get(f"/invt/{invt_id}/subform/{subform}")["data"]
     objects = sf.get("objects") or []
 
@@ -37,18 +43,24 @@ def _process_subform(invt_id, subform):
         if not obj_id:
             raise Exception(f"Subform '{subform}' missing object_id")
 
-    popup = http_get(
-        f"/invt/{invt_id}/subform/{subform}",
-        params={"object_id": obj_id},
-    )["data"]
+    app_type = current_app_type()
+    detail = cached_schema("subform", subform, app_type)
+    if detail is None:
+        popup = http_get(
+            f"/invt/{invt_id}/subform/{subform}",
+            params={"object_id": obj_id},
+        )["data"]
+
+        detail = popup.get("detail") or {}
+        remember_schema("subform", subform, detail, app_type)
 
-    detail = popup.get("detail") or {}
     overrides = build_auto_overrides(invt_id, detail)
-    payload = build_payload(detail, generic_value_resolver, overrides)
+    payload = build_planned_payload(detail, overrides)
 
-    http_put(
+    save_with_repair(
         f"/invt/{invt_id}/subform/{subform}/object/{obj_id}/data/save?",
-        {"data": payload},
+        detail,
+        payload,
     )
 
     return True
@@ -57,48 +69,74 @@ def _process_subform(invt_id, subform):
 # -------------------------------------------------------
 # MAIN GENERIC STEP HANDLER
 # -------------------------------------------------------
-def submit_generic_step(invt_id, step_code):
+def _load_step_detail(invt_id, step_code, app_type):
+    detail = cached_schema("step", step_code, app_type)
+    if detail is not None:
+        return detail
+
     try:
         response = http_get(
             f"/step/{step_code}",
-            params={"invt_id": invt_id, "type": "qip"},
+            params={"invt_id": invt_id, "type": app_type},
         )
         step_data = response.get("data") or {}
         detail = step_data.get("detail") or {}
-    except Exception:
-        detail = {}
+    except (ClientError, ValueError):
+        # the step has no form detail for this application;
+        # transient / auth errors propagate instead of changing the flow
+        return {}
+
+    remember_schema("step", step_code, detail, app_type)
+    return detail
 
-    if not detail:
-        _process_subform(invt_id, step_code)
-        return True
 
-    forms = detail.get("forms") or []
-    panels = detail.get("panels") or []
-    lists = detail.get("lists") or []
-    schema_code = detail.get("code")
+def _save_form(invt_id, step_code, app_type, detail=None):
+    if detail is None:
+        detail = _load_step_detail(invt_id, step_code, app_type)
+    overrides = build_auto_overrides(invt_id, detail)
+    payload = build_planned_payload(detail, overrides)
+    save_with_repair(
+        f"/invt/{invt_id}/form/{step_code}/data/save?",
+        detail,
+        payload,
+    )
 
-    did_something = False
 
-    if forms or panels:
-        overrides = build_auto_overrides(invt_id, detail)
-        payload = build_payload(detail, generic_value_resolver, overrides)
-        http_put(
-            f"/invt/{invt_id}/form/{step_code}/data/save?",
-            {"data": payload},
+def _run_step_plan(invt_id, step_code, app_type, plan, detail=None):
+    if plan["form"]:
+        checkpoint(invt_id, f"form:{step_code}", _save_form, invt_id, step_code, app_type, detail)
+
+    subforms = plan["subforms"]
+    if subforms:
+        parallel_map(
+            # scoped by step: two steps may share a subform code
+            lambda subform: checkpoint(
+                invt_id, f"subform:{step_code}:{subform}", _process_subform, invt_id, subform,
+            ),
+            subforms,
         )
-        did_something = True
 
-    if lists:
-        for item in lists:
-            subform = item["code"]
-            _process_subform(invt_id, subform)
-        did_something = True
 
-    if not did_something and schema_code and schema_code != step_code:
-        _process_subform(invt_id, schema_code)
+def submit_generic_step(invt_id, step_code, app_type="qip"):
+    check_deadline(f"step:{step_code}")
+    plan = load_step_plan(step_code, app_type)
+    if plan is not None:
+        try:
+            _run_step_plan(invt_id, step_code, app_type, plan)
+        except ValidationError:
+            # a rejected value (after repairs, or strict preflight), not a
+            # different form: keep the plan
+            raise
+        except ClientError:
+            # 404 / other 4xx: the server may have changed shape, probe again next time
+            drop_step_plan(step_code, app_type)
+            raise
         return True
 
-    if not did_something:
-        _process_subform(invt_id, step_code)
+    detail = _load_step_detail(invt_id, step_code, app_type)
+    plan = derive_step_plan(step_code, detail)
+
+    _run_step_plan(invt_id, step_code, app_type, plan, detail)
+    record_step_plan(step_code, app_type, plan)
 
     return True
@@ -0,0 +1,65 @@
+# steps/step_graph.py
+#
+# Dependency-aware step scheduler for one application. The primary
+# applicant is created first (several steps reference it), then every step
+# whose prerequisites are done runs in parallel, up to the per-application
+# limit. Ready steps are always started in step_order, so with a limit of 1
+# this is exactly the serial run.
+
+import contextvars
+import json
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from config import STEP_DEPENDENCIES
+
+
+def load_step_dependencies(raw=STEP_DEPENDENCIES):
+    if not raw:
+        return {}
+    deps = json.loads(raw)
+    return {code: list(prereqs) for code, prereqs in deps.items()}
+
+
+def build_step_graph(steps, dependencies=None):
+    # code -> set of prerequisite codes (unknown codes are ignored)
+    codes = [s["code"] for s in steps]
+    known = set(codes)
+    dependencies = dependencies or {}
+    return {
+        code: {d for d in dependencies.get(code, ()) if d in known and d != code}
+        for code in codes
+    }
+
+
+def run_step_graph(steps, run_step, limit, dependencies=None):
+    order = [s["code"] for s in steps]
+    remaining = build_step_graph(steps, dependencies)
+    done = set()
+    running = {}
+    error = None
+
+    with ThreadPoolExecutor(max_workers=max(1, limit), thread_name_prefix="ipm-step") as pool:
+        while (remaining and error is None) or running:
+            if error is None:
+                ready = [c for c in order if c in remaining and remaining[c] <= done]
+                for code in ready[: max(0, limit - len(running))]:
+                    del remaining[code]
+                    ctx = contextvars.copy_context()
+                    running[pool.submit(ctx.run, run_step, code)] = code
+
+            if not running:
+                raise Exception(f"step dependency cycle between: {sorted(remaining)}")
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                code = running.pop(fut)
+                try:
+                    fut.result()
+                    done.add(code)
+                except Exception as e:
+                    # stop scheduling new steps, let the running ones finish
+                    if error is None:
+                        error = e
+
+    if error is not None:
+        raise error
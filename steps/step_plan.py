@@ -0,0 +1,63 @@
+# steps/step_plan.py
+#
+# Per-step execution plans. The first application of a type finds out what
+# a step is by probing (GET /step/{code}, then forms/panels vs lists vs a
+# different schema_code vs the subform fallback). The outcome is recorded
+# as a plan in the schema store and replayed for later applications, which
+# skips the probe GET and the exception-driven fallbacks.
+#
+# A plan is only trusted while the step schema it was derived from is
+# still the one in the store: when the schema entry expires or its
+# fingerprint changes, the step is probed again and the plan re-recorded.
+
+from utils.schema_store import fresh_entry, store_entry, invalidate
+
+
+def derive_step_plan(step_code, detail):
+    if not detail:
+        return {"form": False, "subforms": [step_code]}
+
+    forms = detail.get("forms") or []
+    panels = detail.get("panels") or []
+    lists = detail.get("lists") or []
+    schema_code = detail.get("code")
+
+    plan = {
+        "form": bool(forms or panels),
+        "subforms": [item["code"] for item in lists],
+    }
+
+    if not plan["form"] and not plan["subforms"]:
+        if schema_code and schema_code != step_code:
+            plan["subforms"] = [schema_code]
+        else:
+            plan["subforms"] = [step_code]
+
+    return plan
+
+
+def load_step_plan(step_code, app_type):
+    entry = fresh_entry("plan", step_code, app_type)
+    if entry is None:
+        return None
+
+    schema_fp = entry.get("schema_fingerprint")
+    if schema_fp is not None:
+        schema = fresh_entry("step", step_code, app_type)
+        if schema is None or schema.get("fingerprint") != schema_fp:
+            return None
+
+    return entry["data"]
+
+
+def record_step_plan(step_code, app_type, plan):
+    # no schema entry means the probe GET failed: the plan then lives on TTL alone
+    schema = fresh_entry("step", step_code, app_type)
+    store_entry(
+        "plan", step_code, plan, app_type,
+        schema_fingerprint=schema.get("fingerprint") if schema else None,
+    )
+
+
+def drop_step_plan(step_code, app_type):
+    invalidate("plan", step_code, app_type)
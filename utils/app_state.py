@@ -0,0 +1,119 @@
+# utils/app_state.py
+#
+# Per-application state. Each application run gets its own AppState bound to
+# a context variable, so concurrent runs (engine / step threads) never
+# share caches such as the primary applicant id.
+
+import contextvars
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+
+from api.errors import DeadlineExceeded
+from config import STEP_PARALLELISM
+
+_CURRENT_APP = contextvars.ContextVar("ipm_current_app", default=None)
+
+
+class AppState:
+    def __init__(self, app_type="qip", overrides=None, seed=None):
+        self.app_type = app_type
+        self.invt_id = None
+        self.overrides = dict(overrides or {})
+        self.seed = seed
+        self.rng = random.Random(seed) if seed is not None else None
+        self.think_time = None
+        self.deadline = None  # time.monotonic() by which the run must be done
+        self.step_parallelism = STEP_PARALLELISM
+        self.token = None  # API token from the pool, set on first request
+        self.slots = None  # request semaphore, see request_slot()
+        self.primary_applicants = {}
+        self.lock = threading.RLock()
+
+        # read-through GET cache for this application only
+        self.get_cache = {}
+        self.get_cache_hits = 0
+        self.get_cache_misses = 0
+        self.cache_lock = threading.Lock()
+
+        # timings for the results ledger
+        self.requests = []
+        self.step_timings = []
+        self.error_info = {}
+
+
+def current_app():
+    return _CURRENT_APP.get()
+
+
+def current_app_type(default="qip"):
+    state = _CURRENT_APP.get()
+    return state.app_type if state else default
+
+
+def app_parallelism():
+    state = _CURRENT_APP.get()
+    return state.step_parallelism if state else 1
+
+
+def request_slot(state):
+    # one semaphore per application, shared by the step pool and the nested
+    # subform pools: at most step_parallelism requests in flight, not limit²
+    if state is None or state.step_parallelism <= 1:
+        return nullcontext()
+    if state.slots is None:
+        with state.lock:
+            if state.slots is None:
+                state.slots = threading.BoundedSemaphore(state.step_parallelism)
+    return state.slots
+
+
+def set_deadline(state, seconds):
+    state.deadline = time.monotonic() + seconds if seconds else None
+
+
+def remaining_time():
+    # seconds left in the current application's budget, None if unbounded
+    state = _CURRENT_APP.get()
+    if state is None or state.deadline is None:
+        return None
+    return state.deadline - time.monotonic()
+
+
+def check_deadline(where=""):
+    left = remaining_time()
+    if left is not None and left <= 0:
+        state = _CURRENT_APP.get()
+        raise DeadlineExceeded(f"deadline exceeded for {state.invt_id} at {where or 'step'}")
+
+
+def parallel_map(fn, items, limit=None):
+    # run fn over items on up to `limit` threads, each inside the caller's
+    # context (so the AppState follows); results keep the input order
+    items = list(items)
+    limit = app_parallelism() if limit is None else limit
+    if limit <= 1 or len(items) <= 1:
+        return [fn(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=min(limit, len(items))) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, fn, item) for item in items]
+        return [f.result() for f in futures]
+
+
+def field_overrides(codes):
+    # job-level field overrides that apply to the given field codes
+    state = _CURRENT_APP.get()
+    if state is None or not state.overrides:
+        return {}
+    return {c: state.overrides[c] for c in codes if c in state.overrides}
+
+
+@contextmanager
+def app_scope(state):
+    token = _CURRENT_APP.set(state)
+    try:
+        yield state
+    finally:
+        _CURRENT_APP.reset(token)
@@ -1,12 +1,22 @@
 # utils/applicant.py
 
-from api.http import http_get, http_put
-from utils.random_data import generic_value_resolver
-from utils.schema_payload import build_payload
+from api.http import http_get
+from utils.resolver_plan import compile_plan, run_plan
+from utils.app_state import current_app, current_app_type, field_overrides
+from utils.repair import save_with_repair
+from utils.schema_store import cached_schema, remember_schema
 
 _PRIMARY_APPLICANT_CACHE = {}
 
 
+def _applicant_cache():
+    # isolated per application when running inside an app_scope
+    state = current_app()
+    if state is not None:
+        return state.primary_applicants
+    return _PRIMARY_APPLICANT_CACHE
+
+
 def get_applicant_object_id(invt_id):
     data = http_get(
         f"/invt/{invt_id}/popup_subform/f_invt_project_applicant_information"
@@ -32,8 +42,9 @@ def build_default_applicant_payload(invt_id, detail):
                 print(" ->", field.get("code"))
     print("========================================")
 
-    rdm = {}
-    return build_payload(detail, generic_value_resolver, rdm)
+    plan = compile_plan(detail)
+    rdm = field_overrides(plan.codes)
+    return run_plan(plan, rdm)
 
 
 def get_shareholder_applicant_id(invt_id):
@@ -49,34 +60,50 @@ def get_shareholder_applicant_id(invt_id):
 
 
 def ensure_primary_applicant(invt_id):
-    if invt_id in _PRIMARY_APPLICANT_CACHE:
-        return _PRIMARY_APPLICANT_CACHE[invt_id]
+    state = current_app()
+    if state is None:
+        return _ensure_primary_applicant(invt_id)
+
+    # parallel steps of one application must not create the applicant twice
+    with state.lock:
+        return _ensure_primary_applicant(invt_id)
+
+
+def _ensure_primary_applicant(invt_id):
+    cache = _applicant_cache()
+    if invt_id in cache:
+        return cache[invt_id]
 
     sh = get_shareholder_applicant_id(invt_id)
     if sh:
-        _PRIMARY_APPLICANT_CACHE[invt_id] = sh
+        cache[invt_id] = sh
         return sh
 
     applicant_id = get_applicant_object_id(invt_id)
 
-    popup = http_get(
-        f"/invt/{invt_id}/popup_subform/f_invt_project_applicant_information",
-        params={"object_id": applicant_id},
-    )["data"]
+    app_type = current_app_type()
+    detail = cached_schema("popup", "f_invt_project_applicant_information", app_type)
+    if detail is None:
+        popup = http_get(
+            f"/invt/{invt_id}/popup_subform/f_invt_project_applicant_information",
+            params={"object_id": applicant_id},
+        )["data"]
 
-    detail = popup.get("detail") or {}
+        detail = popup.get("detail") or {}
+        remember_schema("popup", "f_invt_project_applicant_information", detail, app_type)
 
     payload = build_default_applicant_payload(invt_id, detail)
 
-    http_put(
+    save_with_repair(
         f"/invt/{invt_id}/popup_subform/"
         f"f_invt_project_applicant_information/object/{applicant_id}/data/save?",
-        {"data": payload},
+        detail,
+        payload,
     )
 
     print("Applicant popup saved successfully.")
 
-    _PRIMARY_APPLICANT_CACHE[invt_id] = applicant_id
+    cache[invt_id] = applicant_id
     return applicant_id
 
 
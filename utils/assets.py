@@ -0,0 +1,166 @@
+# utils/assets.py
+#
+# In-memory registry of the test assets under picture_automate/. Each
+# folder is scanned once; file bytes and MIME types stay in memory, so
+# uploads never touch the disk on the hot path. Optionally serves smaller
+# variants (downscaled / re-encoded, needs Pillow) capped by ASSET_MAX_SIDE
+# and ASSET_MAX_BYTES.
+
+import hashlib
+import io
+import mimetypes
+import os
+import threading
+
+from config import ASSET_MAX_SIDE, ASSET_MAX_BYTES
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png")
+
+_FOLDERS = {}
+_BY_PATH = {}
+_VARIANTS = {}
+_LOCK = threading.Lock()
+_PIL_WARNED = False
+
+
+class Asset:
+    __slots__ = ("name", "path", "data", "mime", "_digest")
+
+    def __init__(self, name, path, data, mime):
+        self.name = name
+        self.path = path
+        self.data = data
+        self.mime = mime
+        self._digest = None
+
+    @property
+    def size(self):
+        return len(self.data)
+
+    @property
+    def digest(self):
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.data).hexdigest()
+        return self._digest
+
+
+def _norm(path):
+    return os.path.normpath(os.path.abspath(path))
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    mime = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    return Asset(os.path.basename(path), path, data, mime)
+
+
+def folder_assets(folder):
+    # every image directly inside `folder`, loaded once
+    key = _norm(folder)
+    with _LOCK:
+        cached = _FOLDERS.get(key)
+    if cached is not None:
+        return cached
+
+    if not os.path.isdir(folder):
+        raise Exception(f"Folder not found: {folder}")
+
+    names = sorted(f for f in os.listdir(folder) if f.lower().endswith(IMAGE_EXTS))
+    loaded = tuple(_read(os.path.join(folder, n)) for n in names)
+
+    with _LOCK:
+        _FOLDERS[key] = loaded
+        for a in loaded:
+            _BY_PATH[_norm(a.path)] = a
+    return loaded
+
+
+def scan(root="picture_automate"):
+    # preload root and every sub-folder
+    for folder, _, _ in os.walk(root):
+        folder_assets(folder)
+    return {folder: len(items) for folder, items in _FOLDERS.items()}
+
+
+def get_asset(path):
+    key = _norm(path)
+    with _LOCK:
+        asset = _BY_PATH.get(key)
+    if asset is None:
+        asset = _read(path)
+        with _LOCK:
+            _BY_PATH[key] = asset
+    return asset
+
+
+# -------------------------------------------------------
+# SMALLER VARIANTS
+# -------------------------------------------------------
+def _encode(img, fmt, quality):
+    out = io.BytesIO()
+    if fmt == "PNG":
+        img.save(out, format="PNG", optimize=True)
+    else:
+        img.save(out, format="JPEG", quality=quality, optimize=True)
+    return out.getvalue()
+
+
+def _shrink(asset, max_side, max_bytes):
+    global _PIL_WARNED
+    try:
+        from PIL import Image
+    except ImportError:
+        if not _PIL_WARNED:
+            print("assets: Pillow not installed, uploading original files")
+            _PIL_WARNED = True
+        return asset
+
+    img = Image.open(io.BytesIO(asset.data))
+    img.load()
+    fmt = "PNG" if asset.mime == "image/png" else "JPEG"
+    if fmt == "JPEG" and img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+
+    if max_side and max(img.size) > max_side:
+        img.thumbnail((max_side, max_side))
+
+    data = _encode(img, fmt, 85)
+
+    # still too big: PNGs become palette images, JPEGs lose quality
+    if max_bytes and len(data) > max_bytes:
+        if fmt == "PNG":
+            data = _encode(img.convert("P", palette=Image.ADAPTIVE), fmt, 0)
+        else:
+            for quality in (70, 55, 40):
+                data = _encode(img, fmt, quality)
+                if len(data) <= max_bytes:
+                    break
+
+    # last resort: keep shrinking the dimensions
+    while max_bytes and len(data) > max_bytes and max(img.size) > 256:
+        img.thumbnail((int(img.size[0] * 0.75), int(img.size[1] * 0.75)))
+        data = _encode(img, fmt, 70)
+
+    if len(data) >= asset.size:
+        return asset
+    return Asset(asset.name, asset.path, data, asset.mime)
+
+
+def upload_variant(path, max_side=None, max_bytes=None):
+    # the bytes to upload for `path`, shrunk if a cap is configured
+    max_side = ASSET_MAX_SIDE if max_side is None else max_side
+    max_bytes = ASSET_MAX_BYTES if max_bytes is None else max_bytes
+
+    asset = get_asset(path)
+    if not max_side and not (max_bytes and asset.size > max_bytes):
+        return asset
+
+    key = (_norm(path), max_side, max_bytes)
+    with _LOCK:
+        variant = _VARIANTS.get(key)
+    if variant is None:
+        variant = _shrink(asset, max_side, max_bytes)
+        with _LOCK:
+            _VARIANTS[key] = variant
+    return variant
@@ -0,0 +1,106 @@
+# utils/enum_index.py
+#
+# Indexed view of the /formdata/invt enum blob, built once per process:
+# precomputed code / value tuples per option_code and child-code tuples for
+# hierarchical enums (option_code -> parent code -> child codes), so a pick
+# is one rng.choice instead of a list comprehension over the raw items.
+#
+# The index serialises to a compact marshal file. Fleet workers read that
+# file instead of each downloading and indexing the blob (every worker still
+# holds its own copy of the index in memory).
+
+import marshal
+import os
+import tempfile
+import threading
+
+_FORMAT = 1
+
+
+class EnumIndex:
+    __slots__ = ("codes", "values", "children")
+
+    def __init__(self, codes, values, children):
+        self.codes = codes
+        self.values = values
+        self.children = children
+
+    @classmethod
+    def from_enum(cls, enums):
+        codes, values, children = {}, {}, {}
+        for option_code, items in (enums or {}).items():
+            items = items or []
+            codes[option_code] = tuple(i.get("code") for i in items if i.get("code"))
+            values[option_code] = tuple(i.get("value") for i in items if i.get("value") is not None)
+
+            tree = {}
+            stack = list(items)
+            while stack:
+                item = stack.pop()
+                kids = item.get("children") or []
+                if item.get("code") and kids:
+                    tree[item["code"]] = tuple(c.get("code") for c in kids if c.get("code"))
+                stack.extend(kids)
+            if tree:
+                children[option_code] = tree
+
+        return cls(codes, values, children)
+
+    # ---------------------------------------------------
+    # LOOKUPS
+    # ---------------------------------------------------
+    def option_codes(self, option_code):
+        return self.codes.get(option_code, ())
+
+    def option_values(self, option_code):
+        return self.values.get(option_code, ())
+
+    def child_codes(self, option_code, parent_code):
+        return self.children.get(option_code, {}).get(parent_code, ())
+
+    # ---------------------------------------------------
+    # SERIALISATION
+    # ---------------------------------------------------
+    def to_bytes(self):
+        return marshal.dumps((_FORMAT, self.codes, self.values, self.children))
+
+    @classmethod
+    def from_bytes(cls, raw):
+        fmt, codes, values, children = marshal.loads(raw)
+        if fmt != _FORMAT:
+            raise Exception(f"unsupported enum index format: {fmt}")
+        return cls(codes, values, children)
+
+    def save(self, path):
+        folder = os.path.dirname(path) or "."
+        os.makedirs(folder, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=folder, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(self.to_bytes())
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+_INDEX = None
+_LOCK = threading.Lock()
+
+
+def get_enum_index():
+    global _INDEX
+    if _INDEX is None:
+        from utils.random_data import _load_invt_enum
+
+        with _LOCK:
+            if _INDEX is None:
+                _INDEX = EnumIndex.from_enum(_load_invt_enum())
+    return _INDEX
+
+
+def seed_enum_index(index):
+    global _INDEX
+    _INDEX = index
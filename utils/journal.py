@@ -0,0 +1,138 @@
+# utils/journal.py
+#
+# Crash-safe checkpoint journal. Every application (invt_id) and every
+# completed unit of work (form save, subform save, whole step, signature)
+# is recorded in a local SQLite file, so an interrupted run can be resumed
+# at the first incomplete step instead of creating a new application.
+#
+# One connection per thread, WAL mode, so parallel steps and fleet
+# processes can all write to the same file.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from config import JOURNAL, JOURNAL_PATH
+
+_LOCAL = threading.local()
+_ENABLED = JOURNAL
+_PATH = JOURNAL_PATH
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS applications (
+    invt_id     TEXT PRIMARY KEY,
+    app_type    TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    overrides   TEXT,
+    seed        INTEGER,
+    error       TEXT,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS units (
+    invt_id     TEXT NOT NULL,
+    unit        TEXT NOT NULL,
+    done_at     REAL NOT NULL,
+    PRIMARY KEY (invt_id, unit)
+);
+"""
+
+
+def configure(path=None, enabled=None):
+    global _PATH, _ENABLED
+    if path is not None:
+        _PATH = path
+    if enabled is not None:
+        _ENABLED = bool(enabled)
+    _LOCAL.__dict__.clear()
+
+
+def _conn():
+    conn = getattr(_LOCAL, "conn", None)
+    if conn is None or getattr(_LOCAL, "path", None) != _PATH:
+        folder = os.path.dirname(_PATH)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        conn = sqlite3.connect(_PATH, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        _LOCAL.conn = conn
+        _LOCAL.path = _PATH
+    return conn
+
+
+# -------------------------------------------------------
+# APPLICATIONS
+# -------------------------------------------------------
+def record_start(invt_id, app_type, overrides=None, seed=None):
+    if not _ENABLED or invt_id is None:
+        return
+    now = time.time()
+    _conn().execute(
+        "INSERT INTO applications (invt_id, app_type, status, overrides, seed, created_at, updated_at)"
+        " VALUES (?, ?, 'running', ?, ?, ?, ?)"
+        " ON CONFLICT(invt_id) DO UPDATE SET status='running', error=NULL, updated_at=excluded.updated_at",
+        (str(invt_id), app_type, json.dumps(overrides or {}, ensure_ascii=False), seed, now, now),
+    )
+
+
+def record_finish(invt_id, ok, error=None):
+    if not _ENABLED or invt_id is None:
+        return
+    _conn().execute(
+        "UPDATE applications SET status=?, error=?, updated_at=? WHERE invt_id=?",
+        ("done" if ok else "failed", error, time.time(), str(invt_id)),
+    )
+
+
+def unfinished_applications(limit=None):
+    if not _ENABLED:
+        return []
+    sql = ("SELECT invt_id, app_type, overrides, seed, status FROM applications"
+           " WHERE status != 'done' ORDER BY created_at")
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    return [
+        {
+            "invt_id": int(row[0]) if row[0].isdigit() else row[0],
+            "type": row[1],
+            "overrides": json.loads(row[2] or "{}"),
+            "seed": row[3],
+            "status": row[4],
+        }
+        for row in _conn().execute(sql)
+    ]
+
+
+# -------------------------------------------------------
+# UNITS
+# -------------------------------------------------------
+def is_done(invt_id, unit):
+    if not _ENABLED or invt_id is None:
+        return False
+    row = _conn().execute(
+        "SELECT 1 FROM units WHERE invt_id=? AND unit=?", (str(invt_id), unit)
+    ).fetchone()
+    return row is not None
+
+
+def mark_done(invt_id, unit):
+    if not _ENABLED or invt_id is None:
+        return
+    _conn().execute(
+        "INSERT OR REPLACE INTO units (invt_id, unit, done_at) VALUES (?, ?, ?)",
+        (str(invt_id), unit, time.time()),
+    )
+
+
+def checkpoint(invt_id, unit, fn, *args):
+    # run fn once per (invt_id, unit); skipped when already journaled
+    if is_done(invt_id, unit):
+        print(f"↷ already done: {unit}")
+        return None
+    result = fn(*args)
+    mark_done(invt_id, unit)
+    return result
@@ -0,0 +1,245 @@
+# utils/ledger.py
+#
+# Results ledger. Every application run appends structured records to a
+# local SQLite file: the application itself (ids, type, start/end, outcome,
+# error code / log_id from a 400), one row per step and one row per HTTP
+# request (endpoint template, status, latency, payload sizes). The report
+# command turns that into throughput and p50/p95/p99 per step and endpoint,
+# across runs, to compare backend deployments.
+#
+#   python -m utils.ledger report [--runs 3] [--run RUN_ID]
+#   python -m utils.ledger runs
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from config import BASE, LEDGER, LEDGER_PATH
+from utils.app_state import current_app
+
+_LOCAL = threading.local()
+_ENABLED = LEDGER
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS applications (
+    run_id      TEXT NOT NULL,
+    invt_id     TEXT,
+    app_type    TEXT,
+    base        TEXT,
+    started_at  REAL,
+    ended_at    REAL,
+    ok          INTEGER,
+    error       TEXT,
+    error_code  TEXT,
+    log_id      TEXT
+);
+CREATE TABLE IF NOT EXISTS steps (
+    run_id      TEXT NOT NULL,
+    invt_id     TEXT,
+    step        TEXT,
+    started_at  REAL,
+    elapsed     REAL,
+    ok          INTEGER
+);
+CREATE TABLE IF NOT EXISTS requests (
+    run_id      TEXT NOT NULL,
+    invt_id     TEXT,
+    method      TEXT,
+    endpoint    TEXT,
+    status      INTEGER,
+    started_at  REAL,
+    elapsed     REAL,
+    req_bytes   INTEGER,
+    resp_bytes  INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_app_run ON applications(run_id);
+CREATE INDEX IF NOT EXISTS idx_step_run ON steps(run_id);
+CREATE INDEX IF NOT EXISTS idx_req_run ON requests(run_id);
+"""
+
+
+def run_id():
+    # shared by every process of one run (fleet workers inherit the env)
+    rid = os.environ.get("IPM_RUN_ID")
+    if not rid:
+        rid = time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        os.environ["IPM_RUN_ID"] = rid
+    return rid
+
+
+def _conn(path=None):
+    path = path or LEDGER_PATH
+    conns = getattr(_LOCAL, "conns", None)
+    if conns is None:
+        conns = _LOCAL.conns = {}
+    conn = conns.get(path)
+    if conn is None:
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        conns[path] = conn
+    return conn
+
+
+# -------------------------------------------------------
+# RECORDING
+# -------------------------------------------------------
+def timed(name, fn, *args):
+    # run fn and keep its timing on the current AppState as a step record
+    state = current_app()
+    started = time.time()
+    t0 = time.perf_counter()
+    ok = False
+    try:
+        result = fn(*args)
+        ok = True
+        return result
+    finally:
+        if state is not None:
+            state.step_timings.append((name, started, time.perf_counter() - t0, ok))
+
+
+def record_application(state, ok, error=None, started_at=None):
+    if not _ENABLED or state is None:
+        return
+    rid = run_id()
+    invt = str(state.invt_id) if state.invt_id is not None else None
+    info = state.error_info or {}
+    ended = time.time()
+
+    conn = _conn()
+    with conn:
+        conn.execute(
+            "INSERT INTO applications VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (rid, invt, state.app_type, BASE, started_at, ended, int(bool(ok)), error,
+             None if info.get("code") is None else str(info.get("code")),
+             None if info.get("log_id") is None else str(info.get("log_id"))),
+        )
+        conn.executemany(
+            "INSERT INTO steps VALUES (?, ?, ?, ?, ?, ?)",
+            [(rid, invt, name, st, el, int(k)) for name, st, el, k in state.step_timings],
+        )
+        conn.executemany(
+            "INSERT INTO requests VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(rid, invt) + tuple(r) for r in state.requests],
+        )
+
+
+# -------------------------------------------------------
+# REPORT
+# -------------------------------------------------------
+def _pct(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    k = min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))
+    return round(values[k], 4)
+
+
+def _latency_table(rows):
+    groups = {}
+    for key, elapsed, ok in rows:
+        g = groups.setdefault(key, {"n": 0, "errors": 0, "lat": []})
+        g["n"] += 1
+        g["errors"] += 0 if ok else 1
+        g["lat"].append(elapsed)
+    return {
+        key: {
+            "count": g["n"],
+            "errors": g["errors"],
+            "p50": _pct(g["lat"], 50),
+            "p95": _pct(g["lat"], 95),
+            "p99": _pct(g["lat"], 99),
+        }
+        for key, g in sorted(groups.items())
+    }
+
+
+def list_runs(path=None):
+    rows = _conn(path).execute(
+        "SELECT run_id, MIN(started_at), MAX(ended_at), COUNT(*), SUM(ok), base"
+        " FROM applications GROUP BY run_id ORDER BY MIN(started_at)"
+    ).fetchall()
+    return [
+        {"run_id": r[0], "started_at": r[1], "ended_at": r[2], "applications": r[3],
+         "ok": r[4], "base": r[5]}
+        for r in rows
+    ]
+
+
+def report(run_ids=None, last=None, path=None):
+    conn = _conn(path)
+    if not run_ids:
+        runs = [r["run_id"] for r in list_runs(path)]
+        run_ids = runs[-last:] if last else runs
+    if not run_ids:
+        return {"runs": []}
+
+    out = {"runs": []}
+
+    for rid in run_ids:
+        apps = conn.execute(
+            "SELECT started_at, ended_at, ok, error_code FROM applications WHERE run_id = ?", (rid,)
+        ).fetchall()
+        starts = [a[0] for a in apps if a[0] is not None]
+        ends = [a[1] for a in apps if a[1] is not None]
+        if not apps or not starts or not ends:
+            continue
+        wall = max(max(ends) - min(starts), 1e-9)
+        ok = sum(a[2] for a in apps)
+
+        steps = conn.execute(
+            "SELECT step, elapsed, ok FROM steps WHERE run_id = ?", (rid,)
+        ).fetchall()
+        reqs = conn.execute(
+            "SELECT method || ' ' || endpoint, elapsed, status IS NOT NULL AND status < 400"
+            " FROM requests WHERE run_id = ?", (rid,)
+        ).fetchall()
+        codes = {}
+        for a in apps:
+            if a[3]:
+                codes[a[3]] = codes.get(a[3], 0) + 1
+
+        out["runs"].append({
+            "run_id": rid,
+            "applications": len(apps),
+            "ok": ok,
+            "failed": len(apps) - ok,
+            "wall_seconds": round(wall, 3),
+            "apps_per_sec": round(len(apps) / wall, 3),
+            "requests_per_sec": round(len(reqs) / wall, 3),
+            "error_codes": codes,
+            "steps": _latency_table(steps),
+            "endpoints": _latency_table(reqs),
+        })
+
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="IPM results ledger")
+    parser.add_argument("--ledger", default=None, help="ledger file (default LEDGER_PATH)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_report = sub.add_parser("report", help="throughput and p50/p95/p99 per step and endpoint")
+    p_report.add_argument("--run", action="append", dest="runs_ids", help="run id (repeatable)")
+    p_report.add_argument("--runs", type=int, default=None, help="only the last N runs")
+
+    sub.add_parser("runs", help="list recorded runs")
+
+    args = parser.parse_args(argv)
+    if args.cmd == "runs":
+        print(json.dumps(list_runs(args.ledger), indent=2))
+    else:
+        print(json.dumps(report(args.runs_ids, args.runs, args.ledger), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
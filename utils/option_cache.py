@@ -0,0 +1,171 @@
+# utils/option_cache.py
+#
+# Process-wide cache for cascading-select options
+# (/formdata/invt/dependency_option), keyed by (keyword, parent_code).
+# Bounded LRU with a TTL, shared by every application in the process.
+# prefetch_dependency_options() walks the stored schemas and warms the
+# whole province -> district -> commune style tree up front.
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from api.errors import raise_for_response
+from api.transport import request
+from config import BASE, DEP_OPTION_CACHE_SIZE, DEP_OPTION_TTL
+from utils.schema_payload import _iter_fields
+from utils.schema_store import iter_schemas
+
+_CACHE = OrderedDict()
+_LOCK = threading.Lock()
+_STATS = {"hits": 0, "misses": 0, "errors": 0}
+
+
+def _get(key):
+    with _LOCK:
+        entry = _CACHE.get(key)
+        if entry is None:
+            _STATS["misses"] += 1
+            return None
+        if time.time() - entry[0] >= DEP_OPTION_TTL:
+            del _CACHE[key]
+            _STATS["misses"] += 1
+            return None
+        _CACHE.move_to_end(key)
+        _STATS["hits"] += 1
+        return entry[1]
+
+
+def _put(key, options):
+    with _LOCK:
+        _CACHE[key] = (time.time(), options)
+        _CACHE.move_to_end(key)
+        while len(_CACHE) > DEP_OPTION_CACHE_SIZE:
+            _CACHE.popitem(last=False)
+
+
+def _fetch(keyword, parent_code):
+    # no per-application read cache here: these options are shared
+    res = request(
+        "GET",
+        BASE + "/formdata/invt/dependency_option",
+        params={"keyword": keyword, "parent_code": parent_code},
+    )
+    raise_for_response(res)
+    return res.json().get("data") or []
+
+
+def get_dependency_options(keyword, parent_code):
+    # options for (keyword, parent_code), None if the lookup failed
+    if not keyword or not parent_code:
+        return None
+
+    key = (keyword, str(parent_code))
+    options = _get(key)
+    if options is not None:
+        return options
+
+    try:
+        options = _fetch(keyword, parent_code)
+    except Exception as e:
+        with _LOCK:
+            _STATS["errors"] += 1
+        print(f"dependency_option lookup failed ({keyword}, {parent_code}): {e}")
+        return None
+
+    # empty answers are cached too, so dead branches are not re-asked
+    _put(key, options)
+    return options
+
+
+def option_cache_stats():
+    with _LOCK:
+        return {**_STATS, "size": len(_CACHE)}
+
+
+def export_options():
+    with _LOCK:
+        return {f"{k[0]}\x1f{k[1]}": v[1] for k, v in _CACHE.items()}
+
+
+def seed_options(snapshot):
+    for raw_key, options in (snapshot or {}).items():
+        keyword, _, parent = raw_key.partition("\x1f")
+        _put((keyword, parent), options)
+
+
+def clear_options():
+    with _LOCK:
+        _CACHE.clear()
+
+
+# -------------------------------------------------------
+# PREFETCH
+# -------------------------------------------------------
+def _dependent_fields(details):
+    # [(field, parent_field_or_None)] for every dependency_option field
+    found = []
+    for detail in details:
+        fields = [f for f in _iter_fields(detail) if f.get("code")]
+        by_code = {f["code"]: f for f in fields}
+        for f in fields:
+            parent_key = f.get("dependency_option_field_code")
+            if parent_key and f.get("option_code"):
+                found.append((f, by_code.get(parent_key)))
+    return found
+
+
+def prefetch_dependency_options(details=None, app_type=None, max_requests=2000, workers=8):
+    from utils.enum_index import get_enum_index
+
+    if details is None:
+        details = list(iter_schemas(app_type))
+
+    pairs = _dependent_fields(details)
+    if not pairs:
+        return option_cache_stats()
+
+    index = get_enum_index()
+
+    # parent codes known up front: parents that are plain enums
+    parent_codes = {}
+    for field, parent in pairs:
+        if parent is not None and parent.get("option_code") \
+                and not parent.get("dependency_option_field_code"):
+            parent_codes[field["code"]] = list(index.option_codes(parent["option_code"]))
+
+    children = {}
+    for field, parent in pairs:
+        if parent is not None:
+            children.setdefault(parent["code"], []).append(field)
+
+    fields_by_code = {field["code"]: field for field, _ in pairs}
+    frontier = [(code, codes) for code, codes in parent_codes.items()]
+    budget = max_requests
+    seen = set()
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        # breadth-first down the cascade: level N's answers are level N+1's parents
+        while frontier and budget > 0:
+            jobs = []
+            for code, codes in frontier:
+                keyword = fields_by_code[code]["option_code"]
+                for parent_code in codes:
+                    key = (keyword, str(parent_code))
+                    if key in seen or budget <= 0:
+                        continue
+                    seen.add(key)
+                    budget -= 1
+                    jobs.append((code, parent_code, pool.submit(get_dependency_options, keyword, parent_code)))
+
+            next_codes = {}
+            for code, _, fut in jobs:
+                options = fut.result() or []
+                for child in children.get(code, []):
+                    next_codes.setdefault(child["code"], []).extend(
+                        o.get("code") for o in options if o.get("code")
+                    )
+            frontier = list(next_codes.items())
+
+    return option_cache_stats()
@@ -0,0 +1,235 @@
+# utils/preflight.py
+#
+# Pre-flight payload validation. Each detail schema is compiled once (kept on
+# its resolver plan, so it shares the plan's cache and lookup) into
+# per-field constraints: required, data_type, numeric min / max, string and
+# list lengths and confirm-email equality. Calculated fields are only checked
+# when the job overrides them; otherwise run_plan computed them itself.
+# A payload is checked against the constraints before the PUT and every
+# violation is reported at once.
+#
+# The constraints use the same vocabulary as utils/repair.py, so violations
+# (plus anything learned from earlier 400s) are fixed locally by the repair
+# loop instead of costing a server round trip.
+
+import json
+import threading
+
+from api.errors import PreflightError
+from config import PREFLIGHT
+from utils.app_state import field_overrides
+from utils.repair import learned_for, match_target, repair_payload, satisfies, store_scope
+from utils.resolver_plan import compile_plan
+from utils.schema_payload import _iter_fields, compute_key_calculates
+_LOCK = threading.Lock()
+_MODE = PREFLIGHT
+_STATS = {"checked": 0, "invalid": 0, "repaired": 0, "unresolved": 0}
+
+_INT_TYPES = {"int", "integer"}
+_FLOAT_TYPES = {"float", "decimal", "number"}
+
+
+def set_preflight(mode):
+    global _MODE
+    _MODE = mode
+
+
+def preflight_stats():
+    with _LOCK:
+        return dict(_STATS)
+
+
+# -------------------------------------------------------
+# SCHEMA -> CONSTRAINTS
+# -------------------------------------------------------
+def _block_value(block):
+    return block.get("value") if isinstance(block, dict) else block
+
+
+def _truthy(raw):
+    raw = _block_value(raw)
+    if isinstance(raw, str):
+        return raw.strip().lower() in ("1", "true", "yes", "required")
+    return bool(raw)
+
+
+def _number(raw):
+    raw = _block_value(raw)
+    if raw in (None, ""):
+        return None
+    try:
+        value = float(raw)
+    except (TypeError, ValueError):
+        return None
+    return int(value) if value.is_integer() else value
+
+
+def field_constraints(field):
+    validation = field.get("validation") or {}
+    raw_type = validation.get("data_type")
+    data_type = (raw_type.get("value") if isinstance(raw_type, dict) else raw_type or "").lower()
+    field_type = (field.get("field_type_code") or "").lower()
+
+    cons = {}
+    if _truthy(field.get("is_required")) or _truthy(validation.get("required")):
+        cons["required"] = True
+
+    # values the server hands out itself are not second-guessed
+    if field.get("is_permanent_disable") or field_type in ("attachment", "image"):
+        return cons
+    chosen = field.get("option_code") or field.get("value_list") or field.get("dependency_option_field_code")
+
+    min_length = _number(validation.get("min_length"))
+    max_length = _number(validation.get("max_length"))
+
+    if data_type == "list_of_string":
+        cons["type"] = "list"
+    elif chosen or field_type == "multi_select":
+        return cons
+    elif data_type in _INT_TYPES or data_type in _FLOAT_TYPES:
+        cons["type"] = "int" if data_type in _INT_TYPES else "float"
+        lo, hi = _number(validation.get("min")), _number(validation.get("max"))
+        if lo is not None:
+            cons["min"] = lo
+        if hi is not None and (lo is None or hi >= lo):
+            cons["max"] = hi
+        return cons
+    elif data_type == "date":
+        cons["type"] = "date"
+        return cons
+
+    if min_length is not None:
+        cons["min_length"] = int(min_length)
+    if max_length is not None and max_length >= (min_length or 0):
+        cons["max_length"] = int(max_length)
+    return cons
+
+
+class PayloadValidator:
+    def __init__(self, fields, calculated):
+        self.fields = fields          # code -> constraints
+        self.calculated = calculated  # code -> key_calculates
+
+    def check(self, payload, scope=None):
+        # scope: the repair store's form scope, for what earlier 400s taught
+        values = {entry["field_code"]: entry["value"] for entry in payload}
+        store = learned_for(scope) if scope else {}
+        violations = []
+
+        for code, value in values.items():
+            cons = {**self.fields.get(code, {}), **store.get(code, {})}
+            for rule, expected in cons.items():
+                if rule in ("date_format", "regenerate"):
+                    continue
+                single = {rule: expected}
+                if rule == "type" and expected == "date" and "date_format" in cons:
+                    single["date_format"] = cons["date_format"]
+                if not satisfies(value, single, values):
+                    violations.append({
+                        "field_code": code,
+                        "rule": rule,
+                        "expected": single.get("date_format", expected),
+                        "value": value,
+                    })
+
+        # a calculated field only drifts from its total when the job set it
+        for code in field_overrides(self.calculated):
+            if code not in values:
+                continue
+            key_calculates = self.calculated[code]
+            expected = compute_key_calculates(code, key_calculates, values)
+            try:
+                ok = abs(float(values[code]) - expected) < 0.01
+            except (TypeError, ValueError):
+                ok = False
+            if not ok:
+                violations.append({
+                    "field_code": code, "rule": "calculated", "expected": expected, "value": values[code],
+                })
+
+        return violations
+
+    def corrections(self, violations, scope=None):
+        # constraints to hand to the repair loop for the violating fields
+        store = learned_for(scope) if scope else {}
+        return {
+            v["field_code"]: {**self.fields.get(v["field_code"], {}), **store.get(v["field_code"], {})}
+            for v in violations
+        }
+
+
+def _compile(detail):
+    fields = {}
+    calculated = {}
+    for field in _iter_fields(detail):
+        code = field.get("code")
+        if not code:
+            continue
+        if field.get("key_calculates"):
+            calculated[code] = field["key_calculates"]
+            continue
+        cons = field_constraints(field)
+        if cons:
+            fields[code] = cons
+
+    codes = [f.get("code") for f in _iter_fields(detail) if f.get("code")]
+    for code in codes:
+        lower = code.lower()
+        if "confirm" in lower and "email" in lower:
+            other = match_target(code, codes)
+            if other:
+                fields.setdefault(code, {})["same_as"] = other
+
+    return PayloadValidator(fields, calculated)
+
+
+def compile_validator(detail, plan=None):
+    # one validator per resolver plan: no second schema lookup
+    plan = compile_plan(detail) if plan is None else plan
+    validator = plan.attached.get("validator")
+    if validator is None:
+        validator = plan.attached.setdefault("validator", _compile(detail))
+    return validator
+
+
+def validate_payload(detail, payload, scope=None):
+    return compile_validator(detail).check(payload, scope)
+
+
+# -------------------------------------------------------
+# BEFORE THE PUT
+# -------------------------------------------------------
+def _report(path, violations, title="PRE-FLIGHT VIOLATIONS"):
+    print(f"{title} ({path}):")
+    print(json.dumps(violations, indent=2, ensure_ascii=False, default=str))
+
+
+def preflight(path, detail, plan, payload):
+    # returns the payload to send; fixes what it can in repair mode
+    if _MODE == "off":
+        return payload
+
+    validator = compile_validator(detail, plan)
+    scope = store_scope(path)
+    violations = validator.check(payload, scope)
+    with _LOCK:
+        _STATS["checked"] += 1
+        _STATS["invalid"] += bool(violations)
+    if not violations:
+        return payload
+
+    _report(path, violations)
+    if _MODE == "strict":
+        raise PreflightError(
+            f"PRE-FLIGHT {len(violations)} violation(s) on {path}", None, path, details=violations,
+        )
+
+    payload = repair_payload(plan, payload, validator.corrections(violations, scope))
+    left = validator.check(payload, scope)
+    with _LOCK:
+        _STATS["repaired"] += not left
+        _STATS["unresolved"] += bool(left)
+    if left:
+        # the server stays the authority: send it and let the 400 loop decide
+        _report(path, left, "PRE-FLIGHT UNRESOLVED, SENDING ANYWAY")
+    return payload
@@ -0,0 +1,432 @@
+# utils/repair.py
+#
+# Validation-repair loop. When a data/save PUT comes back 400, the
+# VALIDATION DETAILS are parsed into per-field messages, the messages into
+# constraints (required, type, range, length, date format, must match
+# another field, value rejected), and only the offending fields are
+# regenerated through the compiled resolver plan before the save is retried.
+#
+# What was learned is kept in REPAIR_STORE (JSON) per form scope
+# ("<app type>/<form|subform|popup_subform>/<code>") and field code, so later
+# applications apply the corrections before their first save without one
+# form's rule leaking into another form that reuses the field code.
+
+import json
+import os
+import re
+import threading
+from datetime import datetime
+
+from api.errors import ValidationError
+from api.http import http_put
+from config import REPAIR, REPAIR_ATTEMPTS, REPAIR_STORE
+from utils.app_state import current_app_type, field_overrides
+from utils.random_data import _rng, random_email, random_past_date
+from utils.resolver_plan import compile_plan, run_plan
+
+_LOCK = threading.Lock()
+_LEARNED = None  # scope -> field_code -> constraints
+_ENABLED = REPAIR
+
+# constraints that describe the field itself (persisted); "regenerate" is
+# only about the one rejected value and is not kept
+_PERSISTED = ("required", "type", "min", "max", "min_length", "max_length",
+              "date_format", "same_as", "exclude")
+_MAX_EXCLUDED = 50
+_TRIES = 8
+_FORM_RE = re.compile(r"/(form|subform|popup_subform)/([^/?]+)")
+
+
+def set_repair(enabled):
+    global _ENABLED
+    _ENABLED = bool(enabled)
+
+
+# -------------------------------------------------------
+# LEARNED CORRECTIONS STORE
+# -------------------------------------------------------
+def store_scope(path):
+    # the form a save path belongs to, for the current application type
+    m = _FORM_RE.search(path)
+    form = f"{m.group(1)}/{m.group(2)}" if m else path.split("?", 1)[0]
+    return f"{current_app_type()}/{form}"
+
+
+def _read_store():
+    try:
+        with open(REPAIR_STORE, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    # flat field_code -> constraints stores from older runs are dropped
+    return {
+        scope: fields for scope, fields in data.items()
+        if isinstance(fields, dict) and all(isinstance(c, dict) for c in fields.values())
+    }
+
+
+def learned():
+    global _LEARNED
+    if _LEARNED is None:
+        with _LOCK:
+            if _LEARNED is None:
+                _LEARNED = _read_store()
+    return _LEARNED
+
+
+def learned_for(scope):
+    return learned().get(scope, {})
+
+
+def _merge(into, cons):
+    for key in _PERSISTED:
+        if key not in cons:
+            continue
+        if key == "exclude":
+            values = into.get("exclude", [])
+            for v in cons["exclude"]:
+                if v not in values:
+                    values.append(v)
+            into["exclude"] = values[-_MAX_EXCLUDED:]
+        else:
+            into[key] = cons[key]
+
+
+def remember(scope, corrections):
+    # merge new corrections into memory and the file (other processes may
+    # have written theirs since we loaded it)
+    keep = {code: {k: v for k, v in cons.items() if k in _PERSISTED}
+            for code, cons in corrections.items()}
+    keep = {code: cons for code, cons in keep.items() if cons}
+    if not keep:
+        return
+
+    store = learned()
+    with _LOCK:
+        fields = store.setdefault(scope, {})
+        for code, cons in keep.items():
+            _merge(fields.setdefault(code, {}), cons)
+
+        on_disk = _read_store()
+        for known_scope, known in store.items():
+            into = on_disk.setdefault(known_scope, {})
+            for code, cons in known.items():
+                _merge(into.setdefault(code, {}), cons)
+        store.update(on_disk)
+
+        try:
+            folder = os.path.dirname(REPAIR_STORE)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            tmp = f"{REPAIR_STORE}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(on_disk, f, ensure_ascii=False, indent=1, sort_keys=True)
+            os.replace(tmp, REPAIR_STORE)
+        except OSError as e:
+            print("repair store: could not write", REPAIR_STORE, e)
+
+
+# -------------------------------------------------------
+# PARSE THE 400 DETAILS
+# -------------------------------------------------------
+def _text(message):
+    if isinstance(message, dict):
+        return str(message.get("en") or message.get("message") or next(iter(message.values()), ""))
+    return str(message)
+
+
+def _messages(value):
+    if isinstance(value, (list, tuple)):
+        return [_text(m) for m in value]
+    return [_text(value)]
+
+
+def _field_of(key, payload):
+    # "capital", "data.3.value" / "data.3" (index into the payload), "form_data.capital"
+    parts = str(key).split(".")
+    for part in parts:
+        if part.isdigit():
+            idx = int(part)
+            if 0 <= idx < len(payload):
+                return payload[idx]["field_code"]
+            return None
+    codes = {entry["field_code"] for entry in payload}
+    for part in reversed(parts):
+        if part in codes:
+            return part
+    return None
+
+
+def parse_field_errors(details, payload):
+    # -> {field_code: [message, ...]}
+    errors = {}
+
+    def add(key, msgs):
+        code = _field_of(key, payload)
+        if code:
+            errors.setdefault(code, []).extend(msgs)
+
+    if isinstance(details, dict):
+        if isinstance(details.get("errors"), (dict, list)):
+            return parse_field_errors(details["errors"], payload)
+        for key, value in details.items():
+            add(key, _messages(value))
+    elif isinstance(details, list):
+        for item in details:
+            if not isinstance(item, dict):
+                continue
+            key = item.get("field_code") or item.get("code") or item.get("field") or item.get("key")
+            msgs = item.get("messages") or item.get("message") or item.get("error") or ""
+            if key:
+                add(key, _messages(msgs))
+    return errors
+
+
+# -------------------------------------------------------
+# MESSAGES -> CONSTRAINTS
+# -------------------------------------------------------
+_NUM = r"(-?\d+(?:\.\d+)?)"
+
+
+def _php_date_format(fmt):
+    table = {"Y": "%Y", "y": "%y", "m": "%m", "d": "%d", "H": "%H", "i": "%M", "s": "%S"}
+    return "".join(table.get(ch, ch) for ch in fmt)
+
+
+def _number(raw):
+    value = float(raw)
+    return int(value) if value.is_integer() else value
+
+
+def constraints_from_messages(code, messages, payload_codes=()):
+    cons = {}
+    for msg in messages:
+        m = msg.lower()
+
+        fmt = re.search(r"format\s+['\"]?([ymdhisYmdHis/\-.: ]+?)['\"]?[.\s]*$", msg)
+        if fmt:
+            cons["type"] = "date"
+            cons["date_format"] = _php_date_format(fmt.group(1).strip())
+        elif "date" in m and "valid" in m or "not a date" in m or "must be a date" in m:
+            cons["type"] = "date"
+
+        if "required" in m:
+            cons["required"] = True
+        if "integer" in m:
+            cons["type"] = "int"
+        elif "must be a number" in m or "numeric" in m or "decimal" in m:
+            cons.setdefault("type", "float")
+        if "email" in m and ("valid" in m or "format" in m) and "confirm" not in code.lower():
+            cons["type"] = "email"
+
+        chars = "character" in m or "length" in m
+        between = re.search(rf"between\s+{_NUM}\s+and\s+{_NUM}", m)
+        if between:
+            lo, hi = _number(between.group(1)), _number(between.group(2))
+            cons.update({"min_length": int(lo), "max_length": int(hi)} if chars else {"min": lo, "max": hi})
+
+        upper = re.search(rf"(?:not be greater than|not exceed|less than or equal to|at most|maximum(?: of)?|max(?:imum)?:?)\s+{_NUM}", m)
+        if upper:
+            cons["max_length" if chars else "max"] = _number(upper.group(1))
+        below = re.search(rf"(?:must be less than|lower than)\s+{_NUM}", m)
+        if below and not upper:
+            n = _number(below.group(1))
+            cons["max_length" if chars else "max"] = n - 1 if isinstance(n, int) else n
+
+        lower = re.search(rf"(?:at least|greater than or equal to|minimum(?: of)?|min(?:imum)?:?)\s+{_NUM}", m)
+        if lower:
+            cons["min_length" if chars else "min"] = _number(lower.group(1))
+        above = re.search(rf"must be greater than\s+{_NUM}", m)
+        if above and not lower:
+            n = _number(above.group(1))
+            cons["min_length" if chars else "min"] = n + 1 if isinstance(n, int) else n
+
+        if "confirmation" in m or "must match" in m or "does not match" in m and "format" not in m:
+            other = match_target(code, payload_codes)
+            if other:
+                cons["same_as"] = other
+
+        if not cons:
+            # "already been taken", "selected x is invalid", anything else
+            cons["regenerate"] = True
+    return cons
+
+
+def match_target(code, payload_codes):
+    lower = code.lower()
+    for candidate in (re.sub(r"_?confirm(ation)?_?", "_", lower).strip("_"),
+                      lower.replace("confirm_", "").replace("_confirmation", "")):
+        for other in payload_codes:
+            if other != code and other.lower() == candidate:
+                return other
+    if "email" in lower:
+        for other in payload_codes:
+            if other != code and "email" in other.lower() and "confirm" not in other.lower():
+                return other
+    return None
+
+
+# -------------------------------------------------------
+# CONSTRAINED REGENERATION
+# -------------------------------------------------------
+def _as_number(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def satisfies(value, cons, values=None):
+    # does `value` meet the learned constraints (values = the rest of the payload)
+    if cons.get("same_as") and values is not None:
+        return value == values.get(cons["same_as"])
+    if value in (None, "", []):
+        return not cons.get("required")
+    if value in cons.get("exclude", ()):
+        return False
+
+    kind = cons.get("type")
+    if kind in ("int", "float") or "min" in cons or "max" in cons:
+        num = _as_number(value)
+        if num is None or (kind == "int" and float(num) != int(num)):
+            return False
+        if "min" in cons and num < cons["min"]:
+            return False
+        if "max" in cons and num > cons["max"]:
+            return False
+    if kind == "email" and not re.fullmatch(r"[^@\s]+@[^@\s]+\.[^@\s]+", str(value)):
+        return False
+    if kind == "date":
+        try:
+            datetime.strptime(str(value), cons.get("date_format", "%Y-%m-%d"))
+        except ValueError:
+            return False
+    if kind == "list" and not (isinstance(value, list) and all(isinstance(v, str) for v in value)):
+        return False
+    if isinstance(value, (str, list)):
+        if "max_length" in cons and len(value) > cons["max_length"]:
+            return False
+        if "min_length" in cons and len(value) < cons["min_length"]:
+            return False
+    return True
+
+
+def _coerce(value, cons, values):
+    # last resort when the field's own generator cannot hit the constraints
+    if cons.get("same_as"):
+        return values.get(cons["same_as"])
+
+    kind = cons.get("type")
+    if kind in ("int", "float") or "min" in cons or "max" in cons:
+        lo = cons.get("min", 0)
+        hi = cons.get("max", lo + 500)
+        if hi < lo:
+            hi = lo + 500
+        if kind == "int" or (float(lo).is_integer() and float(hi).is_integer()):
+            return _rng().randint(int(lo), int(hi))
+        return round(_rng().uniform(lo, hi), 2)
+    if kind == "email":
+        return random_email()
+    if kind == "date":
+        return datetime.strptime(random_past_date(), "%Y-%m-%d").strftime(cons.get("date_format", "%Y-%m-%d"))
+
+    if kind == "list" or isinstance(value, list):
+        items = [str(v) for v in value] if isinstance(value, list) else []
+        return items[: cons["max_length"]] if "max_length" in cons else items
+
+    text = str(value) if value not in (None, "", []) else f"AUTO_{_rng().randint(1000, 9999)}"
+    if "min_length" in cons and len(text) < cons["min_length"]:
+        text = text + "X" * (cons["min_length"] - len(text))
+    if "max_length" in cons:
+        text = text[: cons["max_length"]]
+    return text
+
+
+def fix_value(field_plan, cons, old, values):
+    context = dict(values)
+    gen = field_plan.gen if field_plan is not None else None
+    for _ in range(_TRIES if gen else 0):
+        value = gen(context)
+        if cons.get("regenerate") and value == old:
+            continue
+        if satisfies(value, cons, values):
+            return value
+    return _coerce(old, cons, values)
+
+
+def repair_payload(plan, payload, corrections):
+    # regenerate only the corrected fields, replay the rest unchanged
+    # (calculated fields are recomputed by run_plan unless the job set them)
+    values = {entry["field_code"]: entry["value"] for entry in payload}
+    by_code = {fp.code: fp for fp in plan.fields}
+
+    # plain fields first, then the ones that must copy another field
+    ordered = sorted(corrections.items(), key=lambda item: bool(item[1].get("same_as")))
+    for code, cons in ordered:
+        if code not in values:
+            continue
+        fp = by_code.get(code)
+        if fp is not None and fp.key_calculates is not None:
+            continue
+        values[code] = fix_value(fp, cons, values[code], values)
+
+    overridden = field_overrides(plan.codes)
+    for fp in plan.fields:
+        if fp.key_calculates is not None and fp.code not in overridden:
+            values.pop(fp.code, None)
+    return run_plan(plan, values)
+
+
+def apply_learned(plan, payload, scope):
+    # corrections from earlier runs, before the first save
+    store = learned_for(scope)
+    if not store:
+        return payload
+    values = {entry["field_code"]: entry["value"] for entry in payload}
+    needed = {code: store[code] for code in values
+              if code in store and not satisfies(values[code], store[code], values)}
+    if not needed:
+        return payload
+    return repair_payload(plan, payload, needed)
+
+
+# -------------------------------------------------------
+# SAVE WITH REPAIR
+# -------------------------------------------------------
+def save_with_repair(path, detail, payload):
+    # http_put(path, {"data": payload}): checked locally first (utils/preflight),
+    # then repaired and retried on a 400
+    from utils.preflight import preflight
+
+    plan = compile_plan(detail)
+    if not _ENABLED:
+        return http_put(path, {"data": preflight(path, detail, plan, payload)})
+
+    scope = store_scope(path)
+    payload = preflight(path, detail, plan, apply_learned(plan, payload, scope))
+    codes = [entry["field_code"] for entry in payload]
+
+    for attempt in range(REPAIR_ATTEMPTS + 1):
+        try:
+            return http_put(path, {"data": payload})
+        except ValidationError as e:
+            errors = parse_field_errors(e.details, payload)
+            if not errors or attempt == REPAIR_ATTEMPTS:
+                raise
+
+            corrections = {code: constraints_from_messages(code, msgs, codes)
+                           for code, msgs in errors.items()}
+            values = {entry["field_code"]: entry["value"] for entry in payload}
+            for code, cons in corrections.items():
+                if cons.get("regenerate") and code in values:
+                    cons["exclude"] = [values[code]] if isinstance(values[code], (str, int, float)) else []
+
+            print(f"repairing {sorted(corrections)} (attempt {attempt + 1}/{REPAIR_ATTEMPTS})")
+            remember(scope, corrections)
+            payload = repair_payload(plan, payload, corrections)
@@ -0,0 +1,386 @@
+# utils/resolver_plan.py
+#
+# Compiled resolver plans: the one path that turns a form schema into a
+# payload. The per-field dispatch (lower(), substring and isinstance checks,
+# enum lookups) runs once per schema shape: each field gets one specialised
+# generator, and running the plan only calls the generators.
+# Plans are cached by the schema's structure (the field keys the compiler
+# reads, without field values), so forms that only differ in their
+# per-application readonly values share one plan; those values are bound per
+# detail. The preflight validator hangs off the same plan.
+
+import threading
+from collections import OrderedDict
+
+from api.upload import upload_temp_attachment, upload_temp_image
+from utils.enum_index import get_enum_index
+from utils.random_data import (
+    _rng,
+    _list_pick_count,
+    _pick_dependent,
+    random_file,
+    random_past_date,
+    random_passport,
+    random_email,
+    random_phone,
+    random_company_name_km,
+    random_English_name,
+)
+from utils.schema_payload import _iter_fields, compute_key_calculates
+
+_NUMERIC_TYPES = {"int", "integer", "float", "decimal", "number"}
+
+# what compile_field and utils/preflight build a field from
+_STRUCTURE_KEYS = ("code", "field_type_code", "option_code", "dependency_option_field_code",
+                   "is_permanent_disable", "is_required", "validation", "value_list",
+                   "key_calculates")
+
+_PLANS = OrderedDict()  # LRU: field codes -> (structure, ResolverPlan)
+_PLANS_MAX = 256
+_PLANS_BY_ID = {}
+_PLANS_BY_ID_MAX = 256
+_LOCK = threading.Lock()
+
+
+class FieldPlan:
+    __slots__ = ("code", "kind", "gen", "key_calculates")
+
+    def __init__(self, code, kind, gen=None, key_calculates=None):
+        self.code = code
+        self.kind = kind
+        self.gen = gen
+        self.key_calculates = key_calculates
+
+
+class ResolverPlan:
+    def __init__(self, fields, readonly=None, attached=None):
+        self.fields = fields
+        self.codes = [f.code for f in fields]
+        self.readonly = readonly or {}  # code -> value of this detail
+        # per-structure extras shared by every binding (preflight validator)
+        self.attached = {} if attached is None else attached
+
+    def bind(self, readonly):
+        # same compiled fields, this detail's readonly values
+        return ResolverPlan(self.fields, readonly, self.attached)
+
+
+# -------------------------------------------------------
+# FIELD HELPERS
+# -------------------------------------------------------
+def _block_value(block):
+    return block.get("value") if isinstance(block, dict) else block
+
+
+def _data_type(validation):
+    raw = validation.get("data_type")
+    return (raw.get("value") if isinstance(raw, dict) else raw or "").lower()
+
+
+def _inline_values(options):
+    values = []
+    for o in options:
+        v = o.get("value") if isinstance(o, dict) else o
+        if v is not None:
+            values.append(v)
+    return tuple(values)
+
+
+def _enum_codes(option_code):
+    return get_enum_index().option_codes(option_code)
+
+
+def _enum_values(option_code):
+    return get_enum_index().option_values(option_code)
+
+
+def _is_readonly(field):
+    return bool(field.get("is_permanent_disable")) and field.get("value") not in (None, "")
+
+
+def _structure(detail):
+    # (lookup key, shape confirming the hit); comparing the shape tuples is
+    # much cheaper than serialising and hashing every field
+    shape = tuple(
+        tuple(field.get(k) for k in _STRUCTURE_KEYS) + (field.get("value") not in (None, ""),)
+        for field in _iter_fields(detail)
+    )
+    return tuple(row[0] for row in shape), shape
+
+
+def _readonly_values(detail):
+    return {
+        field.get("code"): field.get("value")
+        for field in _iter_fields(detail)
+        if field.get("code") and not field.get("key_calculates") and _is_readonly(field)
+    }
+
+
+# -------------------------------------------------------
+# GENERATOR FACTORIES
+# -------------------------------------------------------
+def _choice(values):
+    return lambda ctx: _rng().choice(values)
+
+
+def _sample(values, count):
+    return lambda ctx: _rng().sample(values, count)
+
+
+def _empty_list(ctx):
+    return []
+
+
+def _enum_list(option_code, validation):
+    codes = _enum_codes(option_code)
+    if not codes:
+        return "empty_list", _empty_list
+    return "enum_list", _sample(codes, _list_pick_count(codes, validation))
+
+
+def _numeric(validation, data_type):
+    min_raw = _block_value(validation.get("min"))
+    max_raw = _block_value(validation.get("max"))
+    try:
+        mn = float(min_raw) if min_raw not in (None, "") else 0
+    except (TypeError, ValueError):
+        mn = 0
+    try:
+        mx = float(max_raw) if max_raw not in (None, "") else mn + 500
+    except (TypeError, ValueError):
+        mx = mn + 500
+    if mn > mx:
+        mx = mn + 500
+    if mx > 1_000_00:
+        mx = 1_000_00
+
+    if data_type == "float":
+        return lambda ctx: round(_rng().uniform(mn, mx))
+    lo, hi = int(mn), int(mx)
+    return lambda ctx: int(_rng().randint(lo, hi))
+
+
+def _email(confirm):
+    def gen(ctx):
+        if confirm and "email" in ctx:
+            return ctx["email"]
+        email = random_email()
+        ctx["email"] = email
+        return email
+    return gen
+
+
+def _lat_lng(ctx):
+    lat = round(_rng().uniform(10.0, 14.5), 6)
+    lng = round(_rng().uniform(102.0, 107.0), 6)
+    return f"{lat},{lng}"
+
+
+def _auto_string(ctx):
+    return f"AUTO_{_rng().randint(1000, 9999)}"
+
+
+def _investment_target_detail():
+    child_codes = get_enum_index().child_codes("investment_target", "1")
+    if not child_codes:
+        return "empty_list", _empty_list
+    return "enum_children", _sample(child_codes, min(3, len(child_codes)))
+
+
+# -------------------------------------------------------
+# COMPILER
+# -------------------------------------------------------
+def _compile_value(code, code_lower, validation, data_type, field_type, option_code, options):
+    # the value dispatch, in priority order, after the dependency lookup
+    if data_type == "list_of_string":
+        if code == "investment_target_detail":
+            return _investment_target_detail()
+        values = _inline_values(options)
+        if values:
+            return "inline_list", _sample(values, min(3, len(values)))
+        if option_code:
+            return _enum_list(option_code, validation)
+        return "empty_list", _empty_list
+
+    if field_type == "multi_select":
+        if option_code:
+            return _enum_list(option_code, validation)
+        if options:
+            raw = tuple(options)
+            return "inline_multi", lambda ctx: [_rng().choice(raw)]
+        return "empty_list", _empty_list
+
+    if option_code:
+        codes = _enum_codes(option_code)
+        if codes:
+            return "enum", _choice(codes)
+        values = _enum_values(option_code)
+        if values:
+            return "enum", _choice(values)
+
+    if data_type == "date":
+        return "date", lambda ctx: random_past_date()
+
+    if "lat_lng" in code_lower:
+        return "lat_lng", _lat_lng
+
+    if "passport" in code_lower or "citizen_id" in code_lower:
+        return "passport", lambda ctx: random_passport()
+
+    if options:
+        values = _inline_values(options)
+        if values:
+            return "inline", _choice(values)
+
+    if "email" in code_lower:
+        return "email", _email("confirm" in code_lower)
+
+    if "phone" in code_lower and "code" not in code_lower:
+        return "phone", lambda ctx: random_phone()
+
+    if code_lower.endswith("_km") or code_lower.endswith("_kh"):
+        return "text_km", lambda ctx: random_company_name_km()
+
+    if code_lower.endswith("_en"):
+        return "text_en", lambda ctx: random_English_name()
+
+    if data_type in _NUMERIC_TYPES:
+        return "numeric", _numeric(validation, data_type)
+
+    return "string", _auto_string
+
+
+def compile_field(field):
+    code = (field.get("code") or "").strip()
+    code_lower = code.lower()
+    validation = field.get("validation") or {}
+    data_type = _data_type(validation)
+    field_type = (field.get("field_type_code") or "").lower()
+    option_code = field.get("option_code")
+    dep_parent_key = field.get("dependency_option_field_code")
+    options = field.get("value_list") or []
+
+    if _is_readonly(field):
+        # the value itself is bound per detail (ResolverPlan.readonly)
+        return "readonly", None
+
+    if field_type == "attachment":
+        return "attachment", lambda ctx: upload_temp_attachment(random_file("picture_automate/face_scan"))
+
+    if field_type == "image":
+        return "image", lambda ctx: upload_temp_image(random_file("picture_automate"))
+
+    kind, gen = _compile_value(
+        code, code_lower, validation, data_type, field_type, option_code, options
+    )
+
+    if dep_parent_key:
+        fallback = gen
+
+        def dependent(ctx):
+            parent_value = ctx.get(dep_parent_key)
+            if parent_value:
+                val = _pick_dependent(option_code, parent_value)
+                if val:
+                    return val
+            return fallback(ctx)
+
+        return "dependent", dependent
+
+    return kind, gen
+
+
+def _compile(detail):
+    fields = []
+    for field in _iter_fields(detail):
+        code = field.get("code")
+        if not code:
+            continue
+        key_calculates = field.get("key_calculates") or []
+        if key_calculates:
+            fields.append(FieldPlan(code, "calculated", key_calculates=key_calculates))
+            continue
+        kind, gen = compile_field(field)
+        fields.append(FieldPlan(code, kind, gen))
+    return ResolverPlan(fields)
+
+
+def compile_plan(detail):
+    key = id(detail)
+    with _LOCK:
+        hit = _PLANS_BY_ID.get(key)
+    # the stored detail reference keeps the id from being reused
+    if hit is not None and hit[0] is detail:
+        return hit[1]
+
+    codes, shape = _structure(detail)
+    plan = None
+    with _LOCK:
+        hit = _PLANS.get(codes)
+        if hit is not None and hit[0] == shape:
+            plan = hit[1]
+            _PLANS.move_to_end(codes)
+    if plan is None:
+        plan = _compile(detail)
+        with _LOCK:
+            _PLANS[codes] = (shape, plan)
+            _PLANS.move_to_end(codes)
+            while len(_PLANS) > _PLANS_MAX:
+                _PLANS.popitem(last=False)
+
+    readonly = _readonly_values(detail)
+    if readonly:
+        plan = plan.bind(readonly)
+
+    with _LOCK:
+        if len(_PLANS_BY_ID) >= _PLANS_BY_ID_MAX:
+            _PLANS_BY_ID.clear()
+        _PLANS_BY_ID[key] = (detail, plan)
+    return plan
+
+
+def clear_plans():
+    with _LOCK:
+        _PLANS.clear()
+        _PLANS_BY_ID.clear()
+
+
+# -------------------------------------------------------
+# EXECUTION
+# -------------------------------------------------------
+def run_plan(plan, rdm=None):
+    if rdm is None:
+        rdm = {}
+
+    payload = []
+    context = dict(rdm)
+    generated_values = {}
+
+    for fp in plan.fields:
+        code = fp.code
+
+        if code in generated_values:
+            value = generated_values[code]
+        elif code in rdm:
+            # explicit values win, calculated fields included (preflight
+            # reports an override that disagrees with its total)
+            value = rdm[code]
+            generated_values[code] = value
+        elif fp.key_calculates is not None:
+            value = compute_key_calculates(code, fp.key_calculates, context)
+            generated_values[code] = value
+        elif code in plan.readonly:
+            value = plan.readonly[code]
+            generated_values[code] = value
+        else:
+            value = fp.gen(context)
+            generated_values[code] = value
+
+        context[code] = value
+        payload.append({"field_code": code, "value": value, "comment": None})
+
+    return payload
+
+
+def build_planned_payload(detail, rdm=None):
+    return run_plan(compile_plan(detail), rdm)
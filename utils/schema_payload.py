@@ -64,54 +64,3 @@ def compute_key_calculates(field_code, key_calculates, context):
 
     return round(total, 2)
 
-
-def build_payload(detail, value_resolver, rdm=None):
-    if rdm is None:
-        rdm = {}
-
-    payload = []
-
-    context = dict(rdm)
-    generated_values = {}
-
-    for field in _iter_fields(detail):
-        code = field.get("code")
-        key_calculates = field.get("key_calculates") or []
-
-        if not code:
-            continue
-
-        # Case 1: calculated field
-        if key_calculates:
-            if code in generated_values:
-                value = generated_values[code]
-            else:
-                value = compute_key_calculates(code, key_calculates, context)
-                generated_values[code] = value
-
-            context[code] = value
-            payload.append({"field_code": code, "value": value, "comment": None})
-            continue
-
-        # Case 2: non-calculated field
-        if code in generated_values:
-            value = generated_values[code]
-        else:
-            if code in rdm:
-                value = rdm[code]
-            else:
-                value = value_resolver(field, context)
-
-            generated_values[code] = value
-
-        context[code] = value
-
-        payload.append(
-            {
-                "field_code": code,
-                "value": value,
-                "comment": None,
-            }
-        )
-
-    return payload
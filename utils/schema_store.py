@@ -0,0 +1,237 @@
+# utils/schema_store.py
+#
+# Persistent on-disk store for data that is the same for every application
+# of an environment: the step list, the /formdata/invt enum blob and the
+# step / subform schemas. Entries are keyed by environment (BASE),
+# application type, kind and code, expire after SCHEMA_TTL seconds and are
+# revalidated with ETag / Last-Modified where the server supports it.
+#
+# Per-application data (object ids, saved values, investment_info) is
+# stripped before anything is written.
+
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+
+from config import BASE, SCHEMA_STORE, SCHEMA_STORE_DIR, SCHEMA_TTL
+from api.errors import raise_for_response
+from api.transport import request
+from utils.schema_payload import _iter_fields
+
+_PER_APP_KEYS = {"objects", "investment_info", "object_id", "form_data"}
+
+_MEMORY = {}
+_LOCK = threading.Lock()
+_ENABLED = SCHEMA_STORE
+
+
+def set_enabled(enabled):
+    global _ENABLED
+    _ENABLED = bool(enabled)
+
+
+def fingerprint(data):
+    raw = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _env_key():
+    return hashlib.sha1((BASE or "").encode("utf-8")).hexdigest()[:12]
+
+
+def _path(kind, code, app_type):
+    safe = "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in str(code))
+    return os.path.join(SCHEMA_STORE_DIR, _env_key(), app_type or "_", kind, safe + ".json")
+
+
+# -------------------------------------------------------
+# RAW ENTRY ACCESS (memory first, then disk)
+# -------------------------------------------------------
+def _load(kind, code, app_type):
+    key = (kind, code, app_type)
+    with _LOCK:
+        if key in _MEMORY:
+            return _MEMORY[key]
+
+    try:
+        with open(_path(kind, code, app_type), encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    with _LOCK:
+        _MEMORY[key] = entry
+    return entry
+
+
+def _save(kind, code, app_type, entry):
+    with _LOCK:
+        _MEMORY[(kind, code, app_type)] = entry
+
+    path = _path(kind, code, app_type)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except OSError as e:
+        # the in-memory copy still works, the next process just starts cold
+        print("schema store: could not write", path, e)
+
+
+def _fresh(entry):
+    return entry is not None and time.time() - entry.get("fetched_at", 0) < SCHEMA_TTL
+
+
+def get_entry(kind, code, app_type=None):
+    if not _ENABLED:
+        return None
+    return _load(kind, code, app_type)
+
+
+def fresh_entry(kind, code, app_type=None):
+    entry = get_entry(kind, code, app_type)
+    return entry if _fresh(entry) else None
+
+
+def store_entry(kind, code, data, app_type=None, **meta):
+    if not _ENABLED:
+        return
+    _save(kind, code, app_type, {**meta, "data": data, "fetched_at": time.time()})
+
+
+def invalidate(kind, code, app_type=None):
+    with _LOCK:
+        _MEMORY.pop((kind, code, app_type), None)
+    try:
+        os.remove(_path(kind, code, app_type))
+    except OSError:
+        pass
+
+
+SCHEMA_KINDS = ("step", "subform", "popup")
+
+
+def iter_schemas(app_type=None, kinds=SCHEMA_KINDS):
+    # every stored step / subform / popup schema of this environment
+    if not _ENABLED:
+        return
+    env_dir = os.path.join(SCHEMA_STORE_DIR, _env_key())
+    types = [app_type] if app_type else sorted(os.listdir(env_dir)) if os.path.isdir(env_dir) else []
+    for t in types:
+        for kind in kinds:
+            kind_dir = os.path.join(env_dir, t, kind)
+            if not os.path.isdir(kind_dir):
+                continue
+            for name in sorted(os.listdir(kind_dir)):
+                if not name.endswith(".json"):
+                    continue
+                entry = _load(kind, name[:-5], t)
+                if entry and entry.get("data"):
+                    yield entry["data"]
+
+
+def clear_memory():
+    with _LOCK:
+        _MEMORY.clear()
+
+
+# -------------------------------------------------------
+# ENVIRONMENT-LEVEL RESOURCES (conditional GET)
+# -------------------------------------------------------
+def fetch_cached(kind, code, url, params=None, app_type=None, extract=None):
+    extract = extract or (lambda body: body.get("data"))
+
+    if not _ENABLED:
+        res = request("GET", url, params=params)
+        raise_for_response(res)
+        return extract(res.json())
+
+    entry = _load(kind, code, app_type)
+    if _fresh(entry):
+        return entry["data"]
+
+    headers = {}
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    res = request("GET", url, params=params, headers=headers)
+
+    if res.status_code == 304 and entry:
+        entry = {**entry, "fetched_at": time.time()}
+        _save(kind, code, app_type, entry)
+        return entry["data"]
+
+    raise_for_response(res)
+    data = extract(res.json())
+    _save(kind, code, app_type, {
+        "data": data,
+        "etag": res.headers.get("ETag"),
+        "last_modified": res.headers.get("Last-Modified"),
+        "fetched_at": time.time(),
+        "fingerprint": fingerprint(data),
+    })
+    return data
+
+
+# -------------------------------------------------------
+# STEP / SUBFORM SCHEMAS (fetched per application, stored sanitized)
+# -------------------------------------------------------
+def _strip(obj):
+    if isinstance(obj, dict):
+        return {k: _strip(v) for k, v in obj.items() if k not in _PER_APP_KEYS}
+    if isinstance(obj, list):
+        return [_strip(v) for v in obj]
+    return obj
+
+
+def sanitize_detail(detail):
+    clean = _strip(copy.deepcopy(detail))
+    for field in _iter_fields(clean):
+        field.pop("value", None)
+    return clean
+
+
+def _reusable(detail):
+    # read-only fields carry per-application values the payload must echo back
+    return not any(
+        f.get("is_permanent_disable") and f.get("value") not in (None, "")
+        for f in _iter_fields(detail)
+    )
+
+
+def remember_schema(kind, code, detail, app_type=None):
+    if not _ENABLED or detail is None:
+        return
+    clean = sanitize_detail(detail)
+    fp = fingerprint(clean)
+    reusable = _reusable(detail)
+
+    entry = _load(kind, code, app_type)
+    if _fresh(entry) and entry.get("fingerprint") == fp and entry.get("reusable") == reusable:
+        return
+
+    _save(kind, code, app_type, {
+        "data": clean,
+        "reusable": reusable,
+        "fetched_at": time.time(),
+        "fingerprint": fp,
+    })
+
+
+def cached_schema(kind, code, app_type=None):
+    # a stored schema that can stand in for the live GET, or None.
+    # shared between applications: treat it as read-only
+    if not _ENABLED:
+        return None
+    entry = _load(kind, code, app_type)
+    if not _fresh(entry) or not entry.get("reusable"):
+        return None
+    return entry["data"]